@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search, thumbnails
 from .models import Group, Post
 
 
@@ -9,6 +10,19 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not search.uses_index():
+            return super().get_search_results(request, queryset,
+                                              search_term)
+        return search.search_posts(search_term, queryset), False
+
+    def save_model(self, request, obj, form, change):
+        if "image" in form.changed_data:
+            obj.thumbnail_ready = False
+        super().save_model(request, obj, form, change)
+        if "image" in form.changed_data:
+            thumbnails.schedule(obj)
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ("title", "slug", "description")
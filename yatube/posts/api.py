@@ -0,0 +1,134 @@
+"""Компактный JSON API лент, постов и комментариев только для чтения.
+
+Ленты листаются курсором (``?cursor=``), как и HTML-страницы. Каждый
+ответ несёт ETag и Last-Modified из лёгкого запроса (см.
+``posts.conditional``), поэтому опрос без изменений получает 304 без
+выборки постов и сериализации.
+"""
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+
+from . import timeline
+from .conditional import (POST_FIELDS, TIMELINE_FIELDS, conditional,
+                          make_state)
+from .models import Comment, Group, Post, TimelineEntry
+from .paginator import (COMMENT_ORDERING, COMMENTS_PER_PAGE, FEED_ORDERING,
+                        POSTS_PER_PAGE, TIMELINE_ORDERING, CursorPaginator)
+
+User = get_user_model()
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={
+        "ensure_ascii": False, "separators": (",", ":")})
+
+
+def serialize_post(post):
+    return {
+        "id": post.id,
+        "author": post.author.username,
+        "group": post.group.slug if post.group_id else None,
+        "text": post.text,
+        "pub_date": post.pub_date,
+        "image": post.image.url if post.image else None,
+        "comments": post.comment_count,
+    }
+
+
+def serialize_comment(comment):
+    return {
+        "id": comment.id,
+        "author": comment.author.username,
+        "text": comment.text,
+        "created": comment.created,
+    }
+
+
+def _page(request, queryset, per_page=POSTS_PER_PAGE,
+          ordering=FEED_ORDERING):
+    return CursorPaginator(queryset, per_page, ordering).get_page(
+        request.GET.get("cursor"))
+
+
+def _page_state(request, queryset, fields=POST_FIELDS,
+                ordering=FEED_ORDERING, extra=()):
+    rows = CursorPaginator(queryset, POSTS_PER_PAGE, ordering).page_rows(
+        request.GET.get("cursor"), fields)
+    return make_state(rows, *extra)
+
+
+def _feed(page, posts=None):
+    posts = page.object_list if posts is None else posts
+    return _json({"results": [serialize_post(post) for post in posts],
+                  "next": page.next_cursor,
+                  "previous": page.previous_cursor})
+
+
+@require_GET
+@conditional(lambda request: _page_state(request, Post.objects.all()))
+def index(request):
+    return _feed(_page(request, Post.objects.with_feed_data()))
+
+
+@require_GET
+@conditional(lambda request, slug: _page_state(
+    request, Post.objects.filter(group__slug=slug)))
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _feed(_page(request, group.posts.with_feed_data()))
+
+
+@require_GET
+@conditional(lambda request, username: _page_state(
+    request, Post.objects.filter(author__username=username)))
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return _feed(_page(request, author.posts.with_feed_data()))
+
+
+def _follow_state(request):
+    if not request.user.is_authenticated:
+        return None, None
+    return _page_state(request,
+                       TimelineEntry.objects.filter(user=request.user),
+                       TIMELINE_FIELDS, TIMELINE_ORDERING,
+                       extra=(request.user.pk,))
+
+
+@require_GET
+@conditional(_follow_state)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return _json({"detail": "Требуется вход"}, status=401)
+    page = _page(request, TimelineEntry.objects.filter(user=request.user),
+                 ordering=TIMELINE_ORDERING)
+    return _feed(page, timeline.posts_for(page.object_list))
+
+
+def _post_state(request, post_id):
+    return make_state(list(Post.objects.filter(pk=post_id).values_list(
+        *POST_FIELDS)), dated=True)
+
+
+@require_GET
+@conditional(_post_state)
+def post_detail(request, post_id):
+    post = get_object_or_404(Post.objects.with_feed_data(), pk=post_id)
+    return _json(serialize_post(post))
+
+
+@require_GET
+@conditional(_post_state)
+def comments(request, post_id):
+    # Версия поста растёт с каждым новым, изменённым и удалённым
+    # комментарием, поэтому строки поста достаточно для валидатора любой
+    # порции комментариев.
+    post = get_object_or_404(Post.objects.only("id"), pk=post_id)
+    page = _page(request, Comment.objects.filter(post=post).select_related(
+        "author"), COMMENTS_PER_PAGE, COMMENT_ORDERING)
+    return _json({"results": [serialize_comment(comment)
+                              for comment in page.object_list],
+                  "next": page.next_cursor,
+                  "previous": page.previous_cursor})
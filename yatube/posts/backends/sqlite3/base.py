@@ -0,0 +1,76 @@
+"""SQLite, настроенный для нескольких процессов под нагрузкой.
+
+Стандартный бэкенд оставляет журнал DELETE: запись блокирует читателей,
+а транзакция, начатая как читающая, при попытке записи сразу падает
+с «database is locked», не дожидаясь busy timeout. Здесь:
+
+* каждое новое соединение получает PRAGMA из ``OPTIONS["pragmas"]``
+  поверх ``PRAGMAS``: WAL, synchronous=NORMAL, busy_timeout, mmap и
+  кэш страниц;
+* транзакции начинаются с ``BEGIN IMMEDIATE`` (``OPTIONS
+  ["transaction_mode"]``), так что блокировку на запись ждут сразу,
+  в пределах busy_timeout;
+* постоянные соединения (``CONN_MAX_AGE``) при ``CONN_HEALTH_CHECKS``
+  перед каждым запросом проверяются: соединение должно отвечать и
+  смотреть на тот же файл. Если файл базы подменили, например
+  восстановили из копии, старое соединение читало бы удалённый файл.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    # В WAL режим NORMAL не портит базу при сбое, а лишь может потерять
+    # последние транзакции при отключении питания.
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    # Отрицательное значение — размер в КиБ, а не в страницах.
+    "cache_size": -32 * 1024,
+}
+TRANSACTION_MODES = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = {**PRAGMAS, **kwargs.pop("pragmas", {})}
+        mode = kwargs.pop("transaction_mode", "IMMEDIATE").upper()
+        if mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"transaction_mode должен быть одним из {TRANSACTION_MODES}, "
+                f"а не {mode}.")
+        self.transaction_mode = mode
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        self.inode = None if self.is_in_memory_db() else self._inode()
+        return conn
+
+    def _inode(self):
+        try:
+            return os.stat(self.settings_dict["NAME"]).st_ino
+        except OSError:
+            return None
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f"BEGIN {self.transaction_mode}")
+
+    def is_usable(self):
+        try:
+            self.connection.execute("SELECT 1")
+        except base.Database.Error:
+            return False
+        return self.inode is None or self._inode() == self.inode
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        if (self.connection is not None and not self.in_atomic_block
+                and self.settings_dict.get("CONN_HEALTH_CHECKS")
+                and not self.is_usable()):
+            self.close()
@@ -0,0 +1,5 @@
+"""Нагрузочные замеры: синтетические данные и прогон всех URL постов.
+
+Запуск: ``python manage.py benchmark``; конкурентный замер SQLite из
+нескольких процессов — ``python manage.py benchmark_concurrency``.
+"""
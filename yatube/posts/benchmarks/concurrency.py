@@ -0,0 +1,124 @@
+"""Многопроцессный замер чтения и записи в SQLite.
+
+Одна база с синтетическими данными копируется для каждого профиля
+соединения, и несколько процессов одновременно гоняют через WSGI смесь
+чтения (главная, страница поста) и записи (новый пост, комментарий).
+Профиль ``stock`` — стандартный бэкенд Django: журнал DELETE, новое
+соединение на каждый запрос; ``tuned`` — ``posts.backends.sqlite3``
+с постоянными соединениями.
+
+Запуск: ``python manage.py benchmark_concurrency``.
+"""
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+from . import dataset
+from .runner import Runner, _percentile
+
+PROFILES = {
+    "stock": {"ENGINE": "django.db.backends.sqlite3", "CONN_MAX_AGE": 0},
+    "tuned": {"ENGINE": "posts.backends.sqlite3", "CONN_MAX_AGE": 600,
+              "CONN_HEALTH_CHECKS": True},
+}
+READS = ("posts:index", "posts:post")
+WRITES = ("posts:new_post", "posts:add_comment")
+
+
+def _use_database(path, profile):
+    """Переключает соединение по умолчанию на ``path`` с профилем."""
+    connections.databases[DEFAULT_DB_ALIAS] = {"NAME": path, **profile}
+    connections.ensure_defaults(DEFAULT_DB_ALIAS)
+    connections.prepare_test_settings(DEFAULT_DB_ALIAS)
+    del connections[DEFAULT_DB_ALIAS]
+
+
+def _worker(index, path, profile, runner, scenarios, seconds, write_ratio,
+            barrier, queue):
+    # «database is locked» в профиле stock ожидаем: это и измеряем.
+    logging.disable(logging.CRITICAL)
+    _use_database(path, profile)
+    rng = random.Random(index)
+    runner.rng.seed(index)
+    runner.results = {}
+    barrier.wait()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        names = WRITES if rng.random() < write_ratio else READS
+        scenarios[rng.choice(names)]()
+    connection.close()
+    queue.put({name: (result.requests, result.errors, result.latencies)
+               for name, result in runner.results.items()})
+
+
+def _summary(rows, seconds):
+    requests = sum(row[0] for row in rows)
+    errors = sum(row[1] for row in rows)
+    latencies = sorted(latency for row in rows for latency in row[2])
+    return {
+        "ok_rps": (requests - errors) / seconds,
+        "errors": errors,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+    }
+
+
+def _run_profile(path, profile, runner, scenarios, workers, seconds,
+                 write_ratio):
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(workers)
+    queue = context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(
+            index, path, profile, runner, scenarios, seconds, write_ratio,
+            barrier, queue))
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    # Очередь читаем до join: иначе процесс с большим ответом не выйдет.
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    by_kind = {"read": [], "write": []}
+    for result in results:
+        for name, row in result.items():
+            by_kind["write" if name in WRITES else "read"].append(row)
+    return {kind: _summary(rows, seconds) for kind, rows in by_kind.items()}
+
+
+def run(size=None, workers=4, seconds=10.0, write_ratio=0.2, profiles=None,
+        seed=0):
+    """Замер для каждого профиля: ``{профиль: {read|write: сводка}}``."""
+    profiles = profiles or tuple(PROFILES)
+    directory = tempfile.mkdtemp()
+    seed_path = os.path.join(directory, "seed.sqlite3")
+    connection.settings_dict["TEST"]["NAME"] = seed_path
+    old_name = connection.creation.create_test_db(verbosity=0,
+                                                  autoclobber=True)
+    try:
+        dataset.generate(size, seed=seed)
+        # Сессии и выборки создаются один раз, до копирования базы, и
+        # достаются процессам при fork.
+        runner = Runner(seed=seed, cold_cache=True)
+        scenarios = dict(runner.scenarios())
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode = DELETE")
+        connection.close()
+        results = {}
+        for name in profiles:
+            path = os.path.join(directory, f"{name}.sqlite3")
+            shutil.copyfile(seed_path, path)
+            results[name] = _run_profile(path, PROFILES[name], runner,
+                                         scenarios, workers, seconds,
+                                         write_ratio)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
@@ -0,0 +1,126 @@
+"""Быстрая генерация синтетического набора данных.
+
+Записи вставляются через ``bulk_create`` без сигналов, поэтому после
+вставки ленты подписок и счётчики авторов пересобираются целиком.
+"""
+import datetime as dt
+import random
+from dataclasses import dataclass
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .. import counts, stats, timeline
+from ..importing import explicit_dates
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 2000
+PASSWORD = "benchmark"
+
+
+@dataclass
+class DatasetSize:
+    users: int = 1000
+    groups: int = 20
+    posts: int = 20000
+    comments: int = 40000
+    follows_per_user: int = 30
+    # Показатель степенного закона: чем больше, тем сильнее популярность
+    # сосредоточена у немногих авторов.
+    popularity_exponent: float = 1.1
+    days: int = 365
+
+
+def _batched_create(model, objects):
+    # Размер одного INSERT подбирает сам Django под ограничения СУБД.
+    for start in range(0, len(objects), BATCH_SIZE):
+        model.objects.bulk_create(objects[start:start + BATCH_SIZE])
+
+
+def _random_dates(rng, count, days):
+    now = timezone.now()
+    span = dt.timedelta(days=days).total_seconds()
+    return sorted(now - dt.timedelta(seconds=rng.random() * span)
+                  for _ in range(count))
+
+
+def _power_law_weights(count, exponent):
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def generate(size=None, seed=0):
+    """Заполняет базу и возвращает сводку со сгенерированными объектами."""
+    size = size or DatasetSize()
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)
+    with transaction.atomic():
+        _batched_create(User, [
+            User(username=f"bench_user_{i}", password=password)
+            for i in range(size.users)
+        ])
+        users = list(User.objects.filter(username__startswith="bench_user_")
+                     .order_by("pk").values_list("pk", flat=True))
+        _batched_create(Group, [
+            Group(title=f"Группа {i}", slug=f"bench-group-{i}",
+                  description="Сгенерированная группа")
+            for i in range(size.groups)
+        ])
+        groups = list(Group.objects.filter(slug__startswith="bench-group-")
+                      .values_list("pk", flat=True))
+
+        # Популярные авторы и пишут, и собирают подписчиков чаще.
+        weights = _power_law_weights(len(users), size.popularity_exponent)
+        authors = rng.choices(users, weights=weights, k=size.posts)
+        post_dates = _random_dates(rng, size.posts, size.days)
+        with explicit_dates(Post._meta.get_field("pub_date")):
+            _batched_create(Post, [
+                Post(text=_sentence(rng), author_id=author_id,
+                     group_id=rng.choice(groups + [None]),
+                     pub_date=pub_date)
+                for author_id, pub_date in zip(authors, post_dates)
+            ])
+        posts = list(Post.objects.values_list("pk", flat=True))
+
+        follows = set()
+        for user_id in users:
+            for author_id in rng.choices(users, weights=weights,
+                                         k=size.follows_per_user):
+                if author_id != user_id:
+                    follows.add((user_id, author_id))
+        _batched_create(Follow, [Follow(user_id=user_id, author_id=author_id)
+                                 for user_id, author_id in follows])
+
+        post_weights = _power_law_weights(len(posts),
+                                          size.popularity_exponent)
+        commented = rng.choices(posts, weights=post_weights,
+                                k=size.comments)
+        comment_dates = _random_dates(rng, size.comments, size.days)
+        with explicit_dates(Comment._meta.get_field("created")):
+            _batched_create(Comment, [
+                Comment(post_id=post_id, author_id=rng.choice(users),
+                        text=_sentence(rng), created=created)
+                for post_id, created in zip(commented, comment_dates)
+            ])
+
+    timeline.rebuild()
+    stats.reconcile(User.objects.all())
+    counts.forget(counts.INDEX)
+    counts.forget(counts.GROUP)
+    return {"users": users, "groups": groups, "posts": posts,
+            "follows": len(follows)}
+
+
+WORDS = (
+    "кошка собака дом сад река лес город утро вечер книга письмо "
+    "дорога поезд море солнце дождь снег ветер песня друг работа "
+    "праздник новость фото прогулка кофе чай музыка фильм"
+).split()
+
+
+def _sentence(rng):
+    length = rng.randint(5, 40)
+    return " ".join(rng.choice(WORDS) for _ in range(length)).capitalize()
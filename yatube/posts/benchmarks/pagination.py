@@ -0,0 +1,62 @@
+"""Замер нумерованной ленты при росте таблицы постов.
+
+Таблица постов растёт до каждого размера из ``sizes``, и на каждом шаге
+главная страница ``?page=N`` с одним и тем же номером запрашивается
+через WSGI. Для каждого размера считаются задержка, размер ответа и
+число SQL-запросов: с оконной навигацией они не зависят от числа постов.
+Номер страницы постоянный, чтобы цена OFFSET была одинаковой.
+
+Запуск: ``python manage.py benchmark_pagination``.
+"""
+import datetime as dt
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Post
+from .dataset import _batched_create
+from .runner import Runner
+
+User = get_user_model()
+
+SIZES = (1_000, 10_000, 100_000)
+PAGE = 5
+
+
+def _grow(author, size):
+    """Добавляет посты автора, пока их не станет ``size``."""
+    existing = Post.objects.count()
+    start = timezone.now() - dt.timedelta(seconds=size)
+    with transaction.atomic():
+        _batched_create(Post, [
+            Post(text=f"Пост {index}", author=author,
+                 pub_date=start + dt.timedelta(seconds=index))
+            for index in range(existing, size)
+        ])
+
+
+def run(sizes=SIZES, page=PAGE, iterations=20, warmup=2):
+    """Сводка ``Runner`` для каждого размера таблицы: ``{размер: сводка}``."""
+    old_name = connection.creation.create_test_db(verbosity=0,
+                                                  autoclobber=True)
+    try:
+        author = User.objects.create_user("bench_pagination")
+        runner = Runner()
+        path = reverse("posts:index")
+        results = {}
+        for size in sorted(sizes):
+            _grow(author, size)
+            name = str(size)
+            # Свой параметр у каждого запроса, чтобы не попадать в кэш
+            # страниц: меряется отрисовка, а не выдача из кэша.
+            for index in range(warmup + iterations):
+                if index == warmup:
+                    runner.results.pop(name, None)
+                runner.request(name, path,
+                               data={"page": page, "run": f"{size}-{index}"})
+            results[size] = runner.results[name].summary()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    return results
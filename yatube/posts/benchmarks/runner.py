@@ -0,0 +1,294 @@
+"""Прогон URL приложения posts через WSGI-приложение проекта.
+
+Каждый запрос проходит весь стек middleware. Для каждого имени URL
+считаются пропускная способность, p50/p99 задержки и число SQL-запросов.
+"""
+import json
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from io import BytesIO
+
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY
+from django.contrib.auth import SESSION_KEY, get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.signals import request_finished, request_started
+from django.core.wsgi import get_wsgi_application
+from django.db import close_old_connections, connection
+from django.middleware.csrf import _get_new_csrf_token
+from django.test import RequestFactory
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+MODEL_BACKEND = "django.contrib.auth.backends.ModelBackend"
+
+
+@dataclass
+class ViewResult:
+    name: str
+    requests: int = 0
+    errors: int = 0
+    latencies: list = field(default_factory=list, repr=False)
+    queries: list = field(default_factory=list, repr=False)
+    sizes: list = field(default_factory=list, repr=False)
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        total = sum(latencies)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rps": self.requests / total if total else 0.0,
+            "p50_ms": _percentile(latencies, 50) * 1000,
+            "p99_ms": _percentile(latencies, 99) * 1000,
+            "queries": statistics.median(self.queries) if self.queries else 0,
+            "bytes": statistics.median(self.sizes) if self.sizes else 0,
+        }
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1,
+                round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+@contextmanager
+def keep_connections():
+    """Не закрывает соединения между запросами, как тестовый клиент Django.
+
+    Внутри транзакции теста закрытие оборвало бы её.
+    """
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+    try:
+        yield
+    finally:
+        request_started.connect(close_old_connections)
+        request_finished.connect(close_old_connections)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Session:
+    """Cookies вошедшего пользователя для сырых WSGI-запросов."""
+
+    def __init__(self, user):
+        store = SessionStore()
+        store[SESSION_KEY] = str(user.pk)
+        store[BACKEND_SESSION_KEY] = MODEL_BACKEND
+        store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        store.save()
+        self.csrf_token = _get_new_csrf_token()
+        self.cookie = (f"sessionid={store.session_key}; "
+                       f"csrftoken={self.csrf_token}")
+
+
+class Runner:
+    def __init__(self, seed=0, cold_cache=False):
+        self.application = get_wsgi_application()
+        self.factory = RequestFactory()
+        self.rng = random.Random(seed)
+        self.cold_cache = cold_cache
+        self.results = {}
+
+    def request(self, name, path, method="get", data=None, session=None,
+                expected_status=None):
+        if method == "post":
+            data = dict(data or {})
+            if session:
+                data["csrfmiddlewaretoken"] = session.csrf_token
+            environ = self.factory.post(path, data).environ
+        else:
+            environ = self.factory.get(path, data).environ
+        if session:
+            environ["HTTP_COOKIE"] = session.cookie
+        if self.cold_cache:
+            cache.clear()
+        statuses = []
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(int(status.split()[0]))
+            return BytesIO().write
+
+        result = self.results.setdefault(name, ViewResult(name))
+        queries = QueryCounter()
+        # CaptureQueriesContext не подходит: обработчик WSGI сбрасывает
+        # connection.queries в начале каждого запроса.
+        with keep_connections(), connection.execute_wrapper(queries):
+            started = time.perf_counter()
+            body = self.application(environ, start_response)
+            size = sum(len(chunk) for chunk in body)
+            if hasattr(body, "close"):
+                body.close()
+            elapsed = time.perf_counter() - started
+        result.requests += 1
+        result.latencies.append(elapsed)
+        result.queries.append(queries.count)
+        result.sizes.append(size)
+        if statuses[0] >= 500 and statuses[0] != expected_status:
+            result.errors += 1
+        return statuses[0]
+
+    def scenarios(self):
+        """Пары (имя URL, функция запроса) для каждого URL posts.urls."""
+        users = list(User.objects.order_by("?")[:50])
+        reader = users[0]
+        session = Session(reader)
+        groups = list(Group.objects.values_list("slug", flat=True)[:50])
+        posts = list(Post.objects.select_related("author")
+                     .order_by("?")[:200])
+        own_posts = list(reader.posts.all()[:20]) or posts[:1]
+        own_session = Session(own_posts[0].author)
+        staff = User.objects.filter(is_staff=True).first()
+        if staff is None:
+            staff = User.objects.create_user("bench_staff", is_staff=True)
+        staff_session = Session(staff)
+        pick = self.rng.choice
+
+        def post_kwargs(post):
+            return {"username": post.author.username, "post_id": post.id}
+
+        return [
+            ("posts:index", lambda: self.request(
+                "posts:index", reverse("posts:index"))),
+            ("posts:group", lambda: self.request(
+                "posts:group",
+                reverse("posts:group", kwargs={"slug": pick(groups)}))),
+            ("posts:profile", lambda: self.request(
+                "posts:profile",
+                reverse("posts:profile",
+                        kwargs={"username": pick(users).username}))),
+            ("posts:post", lambda: self.request(
+                "posts:post", reverse("posts:post",
+                                      kwargs=post_kwargs(pick(posts))))),
+            ("posts:follow_index", lambda: self.request(
+                "posts:follow_index", reverse("posts:follow_index"),
+                session=session)),
+            ("posts:search", lambda: self.request(
+                "posts:search", reverse("posts:search"),
+                data={"q": pick(("кошка", "море солнце", "поезд"))})),
+            ("posts:new_post", lambda: self.request(
+                "posts:new_post", reverse("posts:new_post"), method="post",
+                data={"text": "Новый пост из замера"}, session=session)),
+            ("posts:edit", lambda: self.request(
+                "posts:edit",
+                reverse("posts:edit", kwargs=post_kwargs(own_posts[0])),
+                method="post", data={"text": "Правка из замера"},
+                session=own_session)),
+            ("posts:comments", lambda: self.request(
+                "posts:comments",
+                reverse("posts:comments", kwargs=post_kwargs(pick(posts))))),
+            ("posts:add_comment", lambda: self.request(
+                "posts:add_comment",
+                reverse("posts:add_comment",
+                        kwargs=post_kwargs(pick(posts))),
+                method="post", data={"text": "Комментарий"},
+                session=session)),
+            ("posts:profile_follow", lambda: self.request(
+                "posts:profile_follow",
+                reverse("posts:profile_follow",
+                        kwargs={"username": pick(users[1:]).username}),
+                session=session)),
+            ("posts:profile_unfollow", lambda: self.request(
+                "posts:profile_unfollow",
+                reverse("posts:profile_unfollow",
+                        kwargs={"username": pick(users[1:]).username}),
+                session=session)),
+            ("posts:card_cache_stats", lambda: self.request(
+                "posts:card_cache_stats", reverse("posts:card_cache_stats"),
+                session=staff_session)),
+            ("posts:metrics", lambda: self.request(
+                "posts:metrics", reverse("posts:metrics"),
+                session=staff_session)),
+            ("posts:api_index", lambda: self.request(
+                "posts:api_index", reverse("posts:api_index"))),
+            ("posts:api_post", lambda: self.request(
+                "posts:api_post",
+                reverse("posts:api_post",
+                        kwargs={"post_id": pick(posts).id}))),
+            ("posts:api_comments", lambda: self.request(
+                "posts:api_comments",
+                reverse("posts:api_comments",
+                        kwargs={"post_id": pick(posts).id}))),
+            ("posts:api_group", lambda: self.request(
+                "posts:api_group",
+                reverse("posts:api_group", kwargs={"slug": pick(groups)}))),
+            ("posts:api_profile", lambda: self.request(
+                "posts:api_profile",
+                reverse("posts:api_profile",
+                        kwargs={"username": pick(users).username}))),
+            ("posts:api_follow_index", lambda: self.request(
+                "posts:api_follow_index", reverse("posts:api_follow_index"),
+                session=session)),
+            # Маршрут вызывает обработчик 404 без исключения и отвечает 500.
+            ("posts:page_not_found", lambda: self.request(
+                "posts:page_not_found", reverse("posts:page_not_found"),
+                expected_status=500)),
+            ("posts:server_error", lambda: self.request(
+                "posts:server_error", reverse("posts:server_error"),
+                expected_status=500)),
+        ]
+
+    def run(self, iterations=50, warmup=2, names=None):
+        scenarios = [(name, call) for name, call in self.scenarios()
+                     if not names or name in names]
+        for name, call in scenarios:
+            for _ in range(warmup):
+                call()
+            self.results.pop(name, None)
+            for _ in range(iterations):
+                call()
+        return {name: result.summary()
+                for name, result in self.results.items()}
+
+
+def compare(current, baseline, threshold=0.2):
+    """Регрессии относительно сохранённого замера.
+
+    Регрессией считается рост p50 или p99 больше чем на ``threshold`` и
+    любой рост числа SQL-запросов.
+    """
+    regressions = []
+    for name, now in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            limit = before[metric] * (1 + threshold)
+            if before[metric] and now[metric] > limit:
+                regressions.append(
+                    f"{name}: {metric} {before[metric]:.1f} -> "
+                    f"{now[metric]:.1f}")
+        if now["queries"] > before["queries"]:
+            regressions.append(
+                f"{name}: queries {before['queries']} -> {now['queries']}")
+    return regressions
+
+
+def load_baseline(path):
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)["views"]
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, results, meta):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"meta": meta, "views": results}, file,
+                  ensure_ascii=False, indent=2, sort_keys=True)
@@ -0,0 +1,47 @@
+"""Кэш отрисованных карточек постов.
+
+Ключ карточки содержит ``Post.version``, которая растёт при правке поста,
+комментариях, переименовании его группы или автора (см. ``signals``),
+поэтому устаревшие карточки не удаляются, а просто перестают
+запрашиваться.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+CARD_CACHE_TIMEOUT = getattr(settings, "POST_CARD_CACHE_TIMEOUT", 60 * 60 * 24)
+
+counters = Counter(hits=0, misses=0)
+
+
+def card_key(post):
+    return "post-card:{}:{}:{}".format(post.pk,
+                                       int(post.pub_date.timestamp() * 1e6),
+                                       post.version)
+
+
+def get_or_render(post, render):
+    key = card_key(post)
+    html = cache.get(key)
+    if html is not None:
+        counters["hits"] += 1
+        metrics.cache_result("card", True)
+        return html
+    counters["misses"] += 1
+    metrics.cache_result("card", False)
+    html = render()
+    cache.set(key, html, CARD_CACHE_TIMEOUT)
+    return html
+
+
+def stats():
+    """Попадания и промахи кэша карточек в текущем процессе."""
+    total = counters["hits"] + counters["misses"]
+    return {
+        "hits": counters["hits"],
+        "misses": counters["misses"],
+        "hit_ratio": counters["hits"] / total if total else 0.0,
+    }
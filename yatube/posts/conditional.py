@@ -0,0 +1,56 @@
+"""Условные ответы (ETag и Last-Modified) без выборки и отрисовки страницы.
+
+Валидатор строится лёгким запросом ``(id, version, updated)`` по записям
+страницы. Версия поста растёт при правке, при новом или удалённом
+комментарии и при готовности миниатюры, а новые и удалённые посты меняют
+сам набор записей, поэтому совпавший валидатор означает неизменную
+страницу.
+
+Last-Modified по ``updated`` отдаётся только там, где строки целиком
+определяют ответ и не пропадают из набора. После удаления поста
+наибольший ``updated`` ленты не растёт, а счётчик подписчиков в шапке
+его не меняет вовсе: клиент с одним If-Modified-Since получил бы ложный
+304. Такие страницы отдают только ETag.
+"""
+import hashlib
+from functools import wraps
+
+from django.views.decorators.http import condition
+
+POST_FIELDS = ("id", "version", "updated")
+TIMELINE_FIELDS = ("post_id", "post__version", "post__updated")
+
+
+def make_state(rows, *extra, dated=False):
+    """ETag по строкам ``(..., updated)``, для ``dated`` и Last-Modified.
+
+    Для пустого набора валидаторов нет: пустые страницы не стоит беречь.
+    """
+    if not rows:
+        return None, None
+    digest = hashlib.md5(repr((rows, extra)).encode()).hexdigest()
+    return digest, max(row[-1] for row in rows) if dated else None
+
+
+def conditional(state_for):
+    """Отвечает 304, если совпали валидаторы ``state_for(request, **kwargs)``.
+
+    ``state_for`` возвращает пару ``(etag, last_modified)`` и вызывается
+    один раз на запрос, до представления.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            state = []
+
+            def get_state(request, *args, **kwargs):
+                if not state:
+                    state.append(state_for(request, *args, **kwargs))
+                return state[0]
+
+            return condition(
+                etag_func=lambda *a, **kw: get_state(*a, **kw)[0],
+                last_modified_func=lambda *a, **kw: get_state(*a, **kw)[1],
+            )(view)(request, *args, **kwargs)
+        return wrapper
+    return decorator
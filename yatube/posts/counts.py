@@ -0,0 +1,140 @@
+"""Счётчики постов в лентах для нумерованной паджинации.
+
+Как и ``posts.stats``: счётчик меняется атомарным ``UPDATE`` из сигналов,
+а строка, которой ещё нет, создаётся пересчётом при первом чтении.
+Массовые операции без сигналов (импорт, пересборка лент) просто удаляют
+строки через ``forget``.
+
+Пост, добавленный между пересчётом и созданием строки, в неё не попадёт:
+сигнал ещё не находит строку для ``UPDATE``. Такие расхождения чинит
+``reconcile`` (команда ``reconcile_feed_counts``).
+
+Ленты из ``FEED_COUNTS_ESTIMATED`` не поддерживаются на записи: горячая
+строка общей ленты не правится каждым новым постом. Для общей ленты
+оценкой служит наибольший id поста — одно чтение конца индекса, —
+для остальных ``COUNT(*)``, сохранённый в кэше на
+``FEED_COUNTS_ESTIMATE_TIMEOUT``.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+
+from . import stats
+from .models import FeedCount, Follow, Post, TimelineEntry
+
+INDEX = "index"
+GROUP = "group"
+FOLLOW = "follow"
+AUTHOR = "author"
+
+FEED_COUNTS_ESTIMATED = getattr(settings, "FEED_COUNTS_ESTIMATED", ())
+FEED_COUNTS_ESTIMATE_TIMEOUT = getattr(
+    settings, "FEED_COUNTS_ESTIMATE_TIMEOUT", 60 * 10)
+
+BATCH_SIZE = 1000
+
+
+def _source(kind, key):
+    if kind == INDEX:
+        return Post.objects.all()
+    if kind == GROUP:
+        return Post.objects.filter(group_id=key)
+    if kind == FOLLOW:
+        return TimelineEntry.objects.filter(user_id=key)
+    raise ValueError(f"Неизвестная лента: {kind}")
+
+
+def _estimate(kind, key):
+    if kind == INDEX:
+        return Post.objects.aggregate(last=Max("id"))["last"] or 0
+    return cache.get_or_set(f"feed-count:{kind}:{key}",
+                            _source(kind, key).count,
+                            FEED_COUNTS_ESTIMATE_TIMEOUT)
+
+
+def get(kind, key=0):
+    """Число постов в ленте; без строки считает его и сохраняет."""
+    if kind == AUTHOR:
+        return stats.get_stats(key).posts_count
+    if kind in FEED_COUNTS_ESTIMATED:
+        return _estimate(kind, key)
+    count = (FeedCount.objects.filter(kind=kind, key=key)
+             .values_list("count", flat=True).first())
+    if count is not None:
+        return count
+    count = _source(kind, key).count()
+    try:
+        with transaction.atomic():
+            FeedCount.objects.create(kind=kind, key=key, count=count)
+    except IntegrityError:
+        count = FeedCount.objects.get(kind=kind, key=key).count
+    return count
+
+
+def counter(kind, key=0):
+    """``get`` для паджинатора: считается, только если понадобится.
+
+    Для ``AUTHOR`` ключ — сам пользователь.
+    """
+    return lambda: get(kind, key)
+
+
+def change(kind, keys, delta):
+    """Меняет счётчики лент ``kind`` с ключами ``keys`` на ``delta``.
+
+    ``keys`` может быть и подзапросом, например подписчиков автора.
+    """
+    if kind in FEED_COUNTS_ESTIMATED or not delta:
+        return
+    counts = FeedCount.objects.filter(kind=kind, key__in=keys)
+    if delta < 0:
+        counts = counts.filter(count__gte=-delta)
+    counts.update(count=F("count") + delta)
+
+
+def forget(kind, keys=None):
+    """Удаляет счётчики: их пересчитают при следующем чтении."""
+    counts = FeedCount.objects.filter(kind=kind)
+    if keys is not None:
+        counts = counts.filter(key__in=keys)
+    counts.delete()
+
+
+def post_added(post, delta=1):
+    """Пост появился (``delta=1``) или пропал (``-1``) в своих лентах."""
+    change(INDEX, [0], delta)
+    if post.group_id:
+        change(GROUP, [post.group_id], delta)
+    followers = Follow.objects.filter(author_id=post.author_id)
+    change(FOLLOW, followers.values("user_id"), delta)
+
+
+def regroup(old_group_id, new_group_id):
+    """Пост перенесён из одной группы в другую."""
+    if old_group_id == new_group_id:
+        return
+    if old_group_id:
+        change(GROUP, [old_group_id], -1)
+    if new_group_id:
+        change(GROUP, [new_group_id], 1)
+
+
+def reconcile(batch_size=BATCH_SIZE):
+    """Пересчитывает сохранённые счётчики; возвращает число исправлений."""
+    fixed = 0
+    last_pk = 0
+    rows = FeedCount.objects.order_by("pk")
+    while True:
+        batch = list(rows.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return fixed
+        last_pk = batch[-1].pk
+        to_update = []
+        for row in batch:
+            actual = _source(row.kind, row.key).count()
+            if row.count != actual:
+                row.count = actual
+                to_update.append(row)
+        FeedCount.objects.bulk_update(to_update, ["count"])
+        fixed += len(to_update)
@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import images
 from .models import Comment, Post
 
 
@@ -18,6 +20,12 @@ class PostForm(forms.ModelForm):
             'image': ('Картинка')
         }
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            images.validate(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
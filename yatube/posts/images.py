@@ -0,0 +1,129 @@
+"""Подготовка загруженных картинок постов.
+
+С камер приходят JPEG по 10–20 МБ, и миниатюры пришлось бы считать из
+полноразмерных оригиналов. Перед сохранением загруженная картинка:
+
+* проверяется на число пикселей, чтобы «бомба» не заняла всю память;
+* уменьшается до ``IMAGE_MAX_SIDE`` по длинной стороне; JPEG при этом
+  сразу декодируется в уменьшенном масштабе (``Image.draft``);
+* поворачивается по EXIF и перекодируется в ``IMAGE_FORMAT`` без EXIF
+  и XMP; цветовой профиль остаётся;
+* пишется во временный файл, который до ``FILE_UPLOAD_MAX_MEMORY_SIZE``
+  держится в памяти, а дальше на диске. Хранилище копирует его кусками.
+
+Картинку, которую менять не нужно и которую перекодирование не уменьшит,
+сохраняют как есть. Анимации тоже не перекодируются.
+"""
+import logging
+import os
+from dataclasses import dataclass
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from PIL import Image, ImageOps
+
+from . import metrics
+
+IMAGE_MAX_SIDE = getattr(settings, "IMAGE_MAX_SIDE", 2048)
+IMAGE_MAX_PIXELS = getattr(settings, "IMAGE_MAX_PIXELS", 60_000_000)
+IMAGE_FORMAT = getattr(settings, "IMAGE_FORMAT", "WEBP")
+IMAGE_QUALITY = getattr(settings, "IMAGE_QUALITY", 80)
+# Форматы, которые браузеры показывают и которые можно хранить как есть.
+WEB_FORMATS = {"JPEG", "PNG", "GIF", "WEBP"}
+EXTENSIONS = {"WEBP": ".webp", "JPEG": ".jpg", "PNG": ".png"}
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Ingested:
+    file: File
+    original_size: int
+    size: int
+    width: int
+    height: int
+
+    @property
+    def saved(self):
+        return self.original_size - self.size
+
+
+def _open(file):
+    file.seek(0)
+    try:
+        return Image.open(file)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError("Файл не похож на картинку.")
+
+
+def validate(file):
+    """Проверяет загрузку по заголовку, не декодируя картинку."""
+    image = _open(file)
+    try:
+        if image.width * image.height > IMAGE_MAX_PIXELS:
+            raise ValidationError(
+                f"Картинка больше {IMAGE_MAX_PIXELS // 10 ** 6} Мп.")
+        if (getattr(image, "is_animated", False)
+                and max(image.size) > IMAGE_MAX_SIDE):
+            raise ValidationError(
+                f"Анимация больше {IMAGE_MAX_SIDE} px по длинной стороне.")
+    finally:
+        file.seek(0)
+
+
+def _needs_processing(image):
+    return (image.format not in WEB_FORMATS
+            or max(image.size) > IMAGE_MAX_SIDE
+            or bool(image.getexif())
+            or "xmp" in image.info)
+
+
+def _encode(image, output):
+    scale = min(1, IMAGE_MAX_SIDE / max(image.size))
+    image.draft("RGB", (round(image.width * scale),
+                        round(image.height * scale)))
+    icc_profile = image.info.get("icc_profile")
+    # Поворот после уменьшения: так не копируется полноразмерный кадр.
+    image.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE), Image.LANCZOS,
+                    reducing_gap=3.0)
+    image = ImageOps.exif_transpose(image)
+    transparent = (image.mode in ("RGBA", "LA", "PA")
+                   or "transparency" in image.info)
+    image = image.convert("RGBA" if transparent else "RGB")
+    image.save(output, IMAGE_FORMAT, quality=IMAGE_QUALITY,
+               icc_profile=icc_profile)
+    return image.size
+
+
+def ingest(file):
+    """Готовит загрузку к сохранению и возвращает ``Ingested``."""
+    original_size = file.size
+    image = _open(file)
+    kept = Ingested(file, original_size, original_size, *image.size)
+    if getattr(image, "is_animated", False):
+        file.seek(0)
+        return _report(file, kept)
+    needed = _needs_processing(image)
+    output = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+    width, height = _encode(image, output)
+    size = output.tell()
+    if not needed and size >= original_size:
+        output.close()
+        file.seek(0)
+        return _report(file, kept)
+    output.seek(0)
+    stem = os.path.splitext(os.path.basename(file.name))[0]
+    name = stem + EXTENSIONS.get(IMAGE_FORMAT, f".{IMAGE_FORMAT.lower()}")
+    return _report(file, Ingested(File(output, name=name), original_size,
+                                  size, width, height))
+
+
+def _report(source, ingested):
+    logger.info("Картинка %s: %s -> %s байт, сэкономлено %s",
+                source.name, ingested.original_size, ingested.size,
+                ingested.saved)
+    metrics.image_ingested(ingested.original_size, ingested.size)
+    return ingested
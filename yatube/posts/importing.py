@@ -0,0 +1,347 @@
+"""Потоковый импорт групп, постов, комментариев и подписок.
+
+Записи читаются по одной из JSONL или CSV и копятся пачками по
+``batch_size``; каждая пачка вставляется ``bulk_create`` в своей
+транзакции. В памяти держатся только текущие пачки и словари
+username → id и slug → id, поэтому расход памяти не зависит от размера
+файла: комментарии ссылаются на посты по id, а импортируемый пост может
+сохранить свой ``id``. Пост с уже занятым ``id`` (например, правленый пост
+из инкрементальной выгрузки) обновляет существующий.
+
+``bulk_create`` не шлёт сигналов, поэтому в конце импорта ленты подписок,
+счётчики и кэш страниц пересчитываются для затронутых пользователей.
+"""
+import csv
+import json
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import reset_queries, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counts, page_cache, stats, timeline
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+# Поля, которые повторный импорт поста переписывает.
+UPDATED_POST_FIELDS = ("text", "author", "group", "pub_date", "image",
+                       "image_width", "image_height", "image_variants",
+                       "thumbnail_ready", "version", "updated")
+RECORD_TYPES = ("group", "post", "comment", "follow")
+# Сколько id передавать в одном ``__in``: предел переменных SQLite.
+IN_CHUNK = 500
+
+
+class RecordError(ValueError):
+    pass
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Отключает auto_now_add, чтобы вставить заданные даты."""
+    saved = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, saved):
+            field.auto_now_add = value
+
+
+def read_records(file, fmt="jsonl"):
+    """Пары (номер строки, запись); битая строка JSON даёт ``None``."""
+    if fmt == "csv":
+        # Номер строки с учётом заголовка.
+        for number, row in enumerate(csv.DictReader(file), 2):
+            yield number, {key: value for key, value in row.items()
+                           if value not in ("", None)}
+        return
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield number, record if isinstance(record, dict) else None
+
+
+def _chunks(values, size=IN_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _follow_count(user_ids):
+    return sum(Follow.objects.filter(user_id__in=chunk).count()
+               for chunk in _chunks(user_ids))
+
+
+def _parse_date(value):
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise RecordError(f"неверная дата: {value}")
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+class Importer:
+    """Импорт потока записей; ``run`` возвращает счётчики по типам.
+
+    ``create_missing`` создаёт неизвестных пользователей и группы, иначе
+    такие записи пропускаются. С ``images_dir`` картинки постов копируются
+    оттуда в хранилище под ``posts/``, без него поле ``image`` считается
+    уже лежащим в ``MEDIA_ROOT``.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, create_missing=False,
+                 images_dir=None, default_type=None, on_error=None,
+                 on_progress=None):
+        self.batch_size = batch_size
+        self.create_missing = create_missing
+        self.images_dir = images_dir
+        self.default_type = default_type
+        self.on_error = on_error or (lambda number, message: None)
+        self.on_progress = on_progress or (lambda counts, rate: None)
+        self.users = {}
+        self.groups = {}
+        self.batches = {kind: [] for kind in RECORD_TYPES}
+        self.counts = Counter()
+        self.started = None
+        # Для пересчёта после импорта; размер ограничен числом
+        # пользователей и групп, а не длиной файла.
+        self.authors = set()
+        self.followers = set()
+        self.touched_groups = set()
+
+    def run(self, records):
+        self.started = time.monotonic()
+        # Записанные пачки остаются в базе и при ошибке в следующей,
+        # поэтому ленты, счётчики и кэш пересчитываются в любом случае.
+        try:
+            for number, record in records:
+                try:
+                    self.add(record)
+                except RecordError as error:
+                    self.counts["skipped"] += 1
+                    self.on_error(number, str(error))
+                    continue
+                if len(self.batches[self.kind(record)]) >= self.batch_size:
+                    self.flush()
+            self.flush()
+        finally:
+            self.finish()
+        return self.counts
+
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        total = sum(self.counts[kind] for kind in RECORD_TYPES)
+        return total / elapsed if elapsed else 0.0
+
+    def kind(self, record):
+        return record.get("type") or self.default_type
+
+    def add(self, record):
+        if record is None:
+            raise RecordError("не удалось разобрать запись")
+        kind = self.kind(record)
+        if kind not in RECORD_TYPES:
+            raise RecordError(f"неизвестный тип записи: {kind}")
+        try:
+            obj = getattr(self, f"_build_{kind}")(record)
+        except RecordError:
+            raise
+        except (KeyError, TypeError, ValueError) as error:
+            raise RecordError(f"неполная запись: {error!r}")
+        if obj is not None:
+            self.batches[kind].append(obj)
+
+    def _user_id(self, username):
+        if username not in self.users:
+            pk = User.objects.filter(username=username).values_list(
+                "pk", flat=True).first()
+            if pk is None and self.create_missing:
+                pk = User.objects.create_user(username=username).pk
+            self.users[username] = pk
+        if self.users[username] is None:
+            raise RecordError(f"нет пользователя {username}")
+        return self.users[username]
+
+    def _group_id(self, slug):
+        if not slug:
+            return None
+        if slug not in self.groups:
+            pk = Group.objects.filter(slug=slug).values_list(
+                "pk", flat=True).first()
+            if pk is None and self.create_missing:
+                pk = Group.objects.create(title=slug, slug=slug,
+                                          description="").pk
+            self.groups[slug] = pk
+        if self.groups[slug] is None:
+            raise RecordError(f"нет группы {slug}")
+        return self.groups[slug]
+
+    def _image(self, name):
+        if not name or not self.images_dir:
+            return name or None
+        path = os.path.join(self.images_dir, name)
+        try:
+            with open(path, "rb") as file:
+                return default_storage.save(
+                    f"posts/{os.path.basename(name)}", File(file))
+        except OSError as error:
+            raise RecordError(f"не удалось прочитать картинку {path}: "
+                              f"{error.strerror}")
+
+    def _build_group(self, record):
+        # Групп немного, и посты следом ссылаются на них, поэтому группа
+        # создаётся сразу, а не пачкой.
+        group, created = Group.objects.get_or_create(
+            slug=record["slug"],
+            defaults={"title": record.get("title") or record["slug"],
+                      "description": record.get("description", "")})
+        self.groups[group.slug] = group.pk
+        self.counts["group"] += 1
+        return None
+
+    def _build_post(self, record):
+        author = record["author"]
+        post = Post(id=record.get("id"), text=record["text"],
+                    author_id=self._user_id(author),
+                    group_id=self._group_id(record.get("group")),
+                    pub_date=_parse_date(record.get("pub_date")))
+        post.image = self._image(record.get("image"))
+        # Миниатюра посчитается при первом показе, как у старых постов.
+        post.thumbnail_ready = bool(post.image)
+        self.authors.add(post.author_id)
+        if record.get("group"):
+            self.touched_groups.add(record["group"])
+        return post
+
+    def _build_comment(self, record):
+        return Comment(post_id=int(record["post"]), text=record["text"],
+                       author_id=self._user_id(record["author"]),
+                       created=_parse_date(record.get("created")))
+
+    def _build_follow(self, record):
+        user_id = self._user_id(record["user"])
+        author_id = self._user_id(record["author"])
+        if user_id == author_id:
+            raise RecordError("подписка на самого себя")
+        self.followers.add(user_id)
+        self.authors.add(author_id)
+        return Follow(user_id=user_id, author_id=author_id)
+
+    def flush(self):
+        # Посты раньше комментариев: комментарий может ссылаться на пост
+        # из ещё не записанной пачки.
+        posts, comments, follows = (self.batches[kind]
+                                    for kind in ("post", "comment", "follow"))
+        if posts:
+            self._flush_posts(posts)
+        if comments:
+            self._flush_comments(comments)
+        if follows:
+            # ignore_conflicts молча пропускает уже существующие подписки:
+            # считаем строки, которые действительно добавились.
+            user_ids = {follow.user_id for follow in follows}
+            with transaction.atomic():
+                before = _follow_count(user_ids)
+                Follow.objects.bulk_create(follows, ignore_conflicts=True)
+                self.counts["follow"] += _follow_count(user_ids) - before
+        for batch in self.batches.values():
+            batch.clear()
+        # При DEBUG журнал запросов иначе копит текст каждого INSERT.
+        reset_queries()
+        self.on_progress(self.counts, self.rate())
+
+    def _flush_posts(self, posts):
+        incoming = {post.id: post for post in posts if post.id is not None}
+        stored = []
+        for chunk in _chunks(incoming):
+            stored += Post.objects.select_related("group").filter(
+                pk__in=chunk)
+        now = timezone.now()
+        for post in stored:
+            # Прежние автор и группа тоже теряют или меняют пост.
+            self.authors.add(post.author_id)
+            if post.group_id:
+                self.groups.setdefault(post.group.slug, post.group_id)
+                self.touched_groups.add(post.group.slug)
+            record = incoming.pop(post.pk)
+            if post.image != record.image:
+                post.image = record.image
+                post.image_width = post.image_height = None
+                post.image_variants = ""
+                post.thumbnail_ready = record.thumbnail_ready
+            post.text, post.author_id = record.text, record.author_id
+            post.group_id, post.pub_date = record.group_id, record.pub_date
+            # Как и при правке: новая версия сбрасывает карточку.
+            post.version = F("version") + 1
+            post.updated = now
+        created = [post for post in posts if post.id is None]
+        created += incoming.values()
+        with transaction.atomic(), explicit_dates(
+                Post._meta.get_field("pub_date")):
+            Post.objects.bulk_create(created)
+            Post.objects.bulk_update(stored, UPDATED_POST_FIELDS)
+        self.counts["post"] += len(created)
+        self.counts["updated"] += len(stored)
+
+    def _flush_comments(self, comments):
+        existing = set()
+        for chunk in _chunks({comment.post_id for comment in comments}):
+            existing.update(Post.objects.filter(pk__in=chunk).values_list(
+                "pk", flat=True))
+        valid = [comment for comment in comments
+                 if comment.post_id in existing]
+        missing = len(comments) - len(valid)
+        if missing:
+            self.counts["skipped"] += missing
+            self.on_error(None, f"комментариев к несуществующим постам: "
+                                f"{missing}")
+        with transaction.atomic(), explicit_dates(
+                Comment._meta.get_field("created")):
+            Comment.objects.bulk_create(valid)
+            # Как и сигнал для одиночного комментария: новая версия
+            # сбрасывает карточки и валидаторы страниц поста.
+            for chunk in _chunks(existing):
+                Post.objects.filter(pk__in=chunk).update(
+                    version=F("version") + 1, updated=timezone.now())
+        self.counts["comment"] += len(valid)
+
+    def finish(self):
+        """Ленты, счётчики и кэш страниц для затронутых пользователей."""
+        followers = set(self.followers)
+        for chunk in _chunks(self.authors):
+            followers.update(Follow.objects.filter(
+                author_id__in=chunk).values_list("user_id", flat=True))
+        for chunk in _chunks(followers):
+            timeline.rebuild(user_ids=chunk)
+        for chunk in _chunks(followers | self.authors):
+            stats.reconcile(User.objects.filter(pk__in=chunk))
+        counts.forget(counts.INDEX)
+        counts.forget(counts.GROUP, [self.groups[slug]
+                                     for slug in self.touched_groups])
+        usernames = []
+        for chunk in _chunks(self.authors):
+            usernames += User.objects.filter(pk__in=chunk).values_list(
+                "username", flat=True)
+        page_cache.invalidate(
+            page_cache.index_scope(),
+            *(page_cache.profile_scope(name) for name in usernames),
+            *(page_cache.group_scope(slug) for slug in self.touched_groups),
+        )
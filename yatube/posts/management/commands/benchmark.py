@@ -0,0 +1,106 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.benchmarks import dataset, runner
+from posts.models import Post
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, "benchmarks",
+                                "baseline.json")
+
+
+class Command(BaseCommand):
+    help = ("Генерирует синтетические данные во временной базе, прогоняет "
+            "все URL posts через WSGI и сравнивает с сохранённым замером.")
+
+    def add_arguments(self, parser):
+        size = dataset.DatasetSize()
+        parser.add_argument("--users", type=int, default=size.users)
+        parser.add_argument("--groups", type=int, default=size.groups)
+        parser.add_argument("--posts", type=int, default=size.posts)
+        parser.add_argument("--comments", type=int, default=size.comments)
+        parser.add_argument("--follows-per-user", type=int,
+                            default=size.follows_per_user)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--view", action="append", dest="views",
+                            help="имя URL, например posts:index; "
+                                 "можно указать несколько раз")
+        parser.add_argument("--cold-cache", action="store_true",
+                            help="очищать кэш перед каждым запросом")
+        parser.add_argument("--database-file",
+                            help="файл временной базы; по умолчанию "
+                                 "тестовая база из DATABASES (TEST NAME)")
+        parser.add_argument("--keepdb", action="store_true",
+                            help="не удалять базу и не генерировать данные "
+                                 "заново, если они уже есть")
+        parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+        parser.add_argument("--save-baseline", action="store_true")
+        parser.add_argument("--threshold", type=float, default=0.2,
+                            help="допустимый рост задержки, доля")
+
+    def handle(self, *args, **options):
+        if options["database_file"]:
+            connection.settings_dict["TEST"]["NAME"] = options["database_file"]
+        name = connection.creation._get_test_db_name()
+        if (not options["keepdb"]
+                and not connection.creation.is_in_memory_db(name)
+                and os.path.exists(name)):
+            raise CommandError(f"База {name} уже существует: удалите её "
+                               f"или запустите с --keepdb")
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            if not (options["keepdb"] and Post.objects.exists()):
+                self.generate(options)
+            results = runner.Runner(
+                seed=options["seed"], cold_cache=options["cold_cache"]
+            ).run(options["iterations"], options["warmup"], options["views"])
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options["keepdb"])
+        self.report(results)
+        self.compare(results, options)
+
+    def generate(self, options):
+        size = dataset.DatasetSize(
+            users=options["users"], groups=options["groups"],
+            posts=options["posts"], comments=options["comments"],
+            follows_per_user=options["follows_per_user"],
+        )
+        self.stdout.write(f"Генерация данных: {size}")
+        summary = dataset.generate(size, seed=options["seed"])
+        self.stdout.write(f"Подписок: {summary['follows']}")
+
+    def report(self, results):
+        header = (f"{'view':<26}{'req':>6}{'err':>5}{'rps':>9}"
+                  f"{'p50 ms':>9}{'p99 ms':>9}{'queries':>9}")
+        self.stdout.write(header)
+        for name, row in sorted(results.items()):
+            self.stdout.write(
+                f"{name:<26}{row['requests']:>6}{row['errors']:>5}"
+                f"{row['rps']:>9.1f}{row['p50_ms']:>9.1f}"
+                f"{row['p99_ms']:>9.1f}{row['queries']:>9}"
+            )
+
+    def compare(self, results, options):
+        path = options["baseline"]
+        if options["save_baseline"]:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            meta = {key: options[key] for key in
+                    ("users", "groups", "posts", "comments",
+                     "follows_per_user", "seed", "iterations", "cold_cache")}
+            runner.save_baseline(path, results, meta)
+            self.stdout.write(f"Замер сохранён в {path}")
+            return
+        baseline = runner.load_baseline(path)
+        if baseline is None:
+            self.stdout.write("Сохранённого замера нет, сравнивать не с чем")
+            return
+        regressions = runner.compare(results, baseline, options["threshold"])
+        if regressions:
+            raise CommandError("Регрессии:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("Регрессий нет"))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from posts.benchmarks import concurrency, dataset
+
+
+class Command(BaseCommand):
+    help = ("Сравнивает пропускную способность чтения и записи SQLite "
+            "с настройками Django по умолчанию и posts.backends.sqlite3 "
+            "под нагрузкой из нескольких процессов.")
+
+    def add_arguments(self, parser):
+        size = dataset.DatasetSize(posts=5000, comments=10000)
+        parser.add_argument("--users", type=int, default=size.users)
+        parser.add_argument("--groups", type=int, default=size.groups)
+        parser.add_argument("--posts", type=int, default=size.posts)
+        parser.add_argument("--comments", type=int, default=size.comments)
+        parser.add_argument("--follows-per-user", type=int,
+                            default=size.follows_per_user)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--workers", type=int, default=4,
+                            help="число процессов")
+        parser.add_argument("--seconds", type=float, default=10.0,
+                            help="длительность замера каждого профиля")
+        parser.add_argument("--write-ratio", type=float, default=0.2,
+                            help="доля запросов на запись")
+        parser.add_argument("--profile", action="append", dest="profiles",
+                            choices=tuple(concurrency.PROFILES),
+                            help="можно указать несколько раз")
+
+    def handle(self, *args, **options):
+        size = dataset.DatasetSize(
+            users=options["users"], groups=options["groups"],
+            posts=options["posts"], comments=options["comments"],
+            follows_per_user=options["follows_per_user"],
+        )
+        self.stdout.write(f"Генерация данных: {size}")
+        results = concurrency.run(
+            size, workers=options["workers"], seconds=options["seconds"],
+            write_ratio=options["write_ratio"], profiles=options["profiles"],
+            seed=options["seed"])
+        self.stdout.write(f"{'profile':<10}{'kind':<7}{'ok rps':>9}"
+                          f"{'errors':>8}{'p50 ms':>9}{'p99 ms':>9}")
+        for profile, kinds in results.items():
+            for kind, row in kinds.items():
+                self.stdout.write(
+                    f"{profile:<10}{kind:<7}{row['ok_rps']:>9.1f}"
+                    f"{row['errors']:>8}{row['p50_ms']:>9.1f}"
+                    f"{row['p99_ms']:>9.1f}")
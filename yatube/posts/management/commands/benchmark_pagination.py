@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts.benchmarks import pagination
+
+
+class Command(BaseCommand):
+    help = ("Показывает задержку, размер ответа и число запросов "
+            "нумерованной ленты при росте таблицы постов.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, action="append",
+                            dest="sizes",
+                            help="число постов; можно указать несколько раз")
+        parser.add_argument("--page", type=int, default=pagination.PAGE)
+        parser.add_argument("--iterations", type=int, default=20)
+
+    def handle(self, *args, **options):
+        results = pagination.run(
+            sizes=options["sizes"] or pagination.SIZES,
+            page=options["page"], iterations=options["iterations"])
+        self.stdout.write(f"{'posts':>9}{'p50 ms':>9}{'p99 ms':>9}"
+                          f"{'bytes':>10}{'queries':>9}")
+        for size, row in results.items():
+            self.stdout.write(
+                f"{size:>9}{row['p50_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+                f"{row['bytes']:>10.0f}{row['queries']:>9}")
@@ -0,0 +1,57 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import exporting
+
+
+class Command(BaseCommand):
+    help = ("Потоково выгружает группы, посты, комментарии и подписки "
+            "в <модель>.jsonl.gz.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="Каталог для файлов выгрузки")
+        parser.add_argument("--models", nargs="+",
+                            choices=tuple(exporting.EXPORTERS),
+                            default=tuple(exporting.EXPORTERS))
+        parser.add_argument("--since", type=self.parse_since,
+                            help="Посты, изменённые, и комментарии, "
+                                 "созданные не раньше даты")
+        parser.add_argument("--after-id", type=int,
+                            help="Только строки с большим id")
+        parser.add_argument("--incremental", metavar="MANIFEST",
+                            help="Продолжить от манифеста прошлой выгрузки")
+
+    @staticmethod
+    def parse_since(value):
+        date = parse_datetime(value)
+        if date is None:
+            raise ValueError(value)
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date)
+        return date
+
+    def handle(self, *args, **options):
+        since = options["since"]
+        after_ids = dict.fromkeys(options["models"], options["after_id"])
+        if options["incremental"]:
+            try:
+                manifest = exporting.load_manifest(options["incremental"])
+            except (OSError, ValueError, KeyError) as error:
+                raise CommandError(f"Не удалось прочитать манифест: {error}")
+            since = manifest["started"]
+            for name, model in manifest["models"].items():
+                # У моделей с датой новизну решает дата, иначе — id.
+                if exporting.EXPORTERS[name][1] is None:
+                    after_ids[name] = model["max_id"]
+        manifest = exporting.export(options["directory"], options["models"],
+                                    since, after_ids, self.report_progress)
+        for name, model in manifest["models"].items():
+            self.stdout.write(f"{name}: {model['rows']}")
+        self.stdout.write("Манифест: {}".format(
+            os.path.join(options["directory"], exporting.MANIFEST)))
+
+    def report_progress(self, name, rows):
+        self.stderr.write(f"{name}: {rows}…")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ("Считает варианты миниатюр и заглушки для постов с картинкой, "
+            "у которых их ещё нет.")
+
+    def handle(self, *args, **options):
+        post_ids = (Post.objects.exclude(image="").exclude(image=None)
+                    .filter(image_variants="").order_by("id")
+                    .values_list("id", flat=True))
+        # id читаются заранее: generate пишет в ту же таблицу.
+        post_ids = list(post_ids)
+        for post_id in post_ids:
+            thumbnails.generate(post_id)
+        self.stdout.write(f"Обработано постов: {len(post_ids)}")
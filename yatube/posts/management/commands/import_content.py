@@ -0,0 +1,68 @@
+import gzip
+import io
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importing
+
+
+class Command(BaseCommand):
+    help = ("Потоково импортирует группы, посты, комментарии и подписки "
+            "из JSONL или CSV (можно .gz).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл с записями или - для stdin")
+        parser.add_argument("--format", choices=("jsonl", "csv"),
+                            help="По умолчанию — по расширению файла")
+        parser.add_argument("--type", choices=importing.RECORD_TYPES,
+                            help="Тип записей без поля type (нужен для CSV)")
+        parser.add_argument("--batch-size", type=int,
+                            default=importing.BATCH_SIZE)
+        parser.add_argument("--create-missing", action="store_true",
+                            help="Создавать неизвестных авторов и группы")
+        parser.add_argument("--images", metavar="DIR",
+                            help="Копировать картинки постов из каталога")
+
+    def open(self, path):
+        if path == "-":
+            return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8",
+                                    newline="")
+        try:
+            if path.endswith(".gz"):
+                return gzip.open(path, "rt", encoding="utf-8", newline="")
+            return open(path, encoding="utf-8", newline="")
+        except OSError as error:
+            raise CommandError(f"Не удалось открыть {path}: "
+                               f"{error.strerror}")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        name = path[:-len(".gz")] if path.endswith(".gz") else path
+        fmt = options["format"] or ("csv" if name.endswith(".csv")
+                                    else "jsonl")
+        importer = importing.Importer(
+            batch_size=options["batch_size"],
+            create_missing=options["create_missing"],
+            images_dir=options["images"],
+            default_type=options["type"],
+            on_error=self.report_error,
+            on_progress=self.report_progress,
+        )
+        with self.open(path) as file:
+            counts = importer.run(importing.read_records(file, fmt))
+        self.stdout.write(
+            "Импортировано: групп {group}, постов {post}, комментариев "
+            "{comment}, подписок {follow}; обновлено постов {updated}; "
+            "пропущено {skipped} ({rate:.0f} в секунду)"
+            .format(rate=importer.rate(),
+                    **{key: counts[key] for key in
+                       (*importing.RECORD_TYPES, "updated", "skipped")}))
+
+    def report_error(self, number, message):
+        where = f"строка {number}: " if number else ""
+        self.stderr.write(f"{where}{message}")
+
+    def report_progress(self, counts, rate):
+        total = sum(counts[kind] for kind in importing.RECORD_TYPES)
+        self.stdout.write(f"Записей: {total} ({rate:.0f} в секунду)")
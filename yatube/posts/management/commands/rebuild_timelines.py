@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = "Пересобирает материализованные ленты подписок."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append",
+                            dest="user_ids",
+                            help="id подписчика; можно указать несколько раз")
+        parser.add_argument("--batch-size", type=int,
+                            default=timeline.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        count = timeline.rebuild(options["user_ids"], options["batch_size"])
+        self.stdout.write(f"Пересобрано лент: {count}")
@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import stats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Сверяет счётчики авторов с исходными таблицами и чинит их."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int,
+                            default=stats.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        fixed = stats.reconcile(User.objects.all(), options["batch_size"])
+        self.stdout.write(f"Исправлено счётчиков: {fixed}")
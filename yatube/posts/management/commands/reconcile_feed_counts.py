@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts import counts
+
+
+class Command(BaseCommand):
+    help = "Сверяет счётчики постов в лентах с исходными таблицами."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int,
+                            default=counts.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        fixed = counts.reconcile(options["batch_size"])
+        self.stdout.write(f"Исправлено счётчиков: {fixed}")
@@ -0,0 +1,199 @@
+"""Раздача загруженных файлов через фронтенд-сервер.
+
+Представление только проверяет доступ и отвечает заголовками, а байты
+отдаёт nginx (``X-Accel-Redirect``) или Apache с mod_xsendfile
+(``X-Sendfile``), поэтому воркер Python не занят отправкой картинок.
+Диапазоны (Range) фронтенд-сервер обслуживает сам. Для nginx нужна
+внутренняя локация::
+
+    location /protected-media/ {
+        internal;
+        alias /path/to/media/;
+    }
+
+Имена файлов в хранилище не переиспользуются: новая загрузка с тем же
+именем получает суффикс, а миниатюры sorl названы по хэшу. Поэтому
+ответы кэшируются надолго с ``immutable``. ETag считается по размеру и
+времени изменения в формате nginx, так что 304 от Django и от nginx
+совпадают; результат проверки вместе с ETag хранится в кэше.
+
+Без ``MEDIA_SERVER`` (разработка, тесты) файл отдаёт сам Django, тоже
+с поддержкой одного диапазона.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from dataclasses import dataclass
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from .models import Post
+
+# "nginx", "apache" или пусто: отдавать файлы из Django.
+MEDIA_SERVER = getattr(settings, "MEDIA_SERVER", "")
+MEDIA_ACCEL_PREFIX = getattr(settings, "MEDIA_ACCEL_PREFIX",
+                             "/protected-media/")
+MEDIA_CACHE_SECONDS = getattr(settings, "MEDIA_CACHE_SECONDS",
+                              60 * 60 * 24 * 365)
+MEDIA_LOOKUP_TIMEOUT = getattr(settings, "MEDIA_LOOKUP_TIMEOUT", 60 * 5)
+
+UPLOADS_PREFIX = Post._meta.get_field("image").upload_to
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+@dataclass
+class MediaFile:
+    name: str
+    path: str
+    size: int
+    mtime: int
+    content_type: str
+
+    @property
+    def etag(self):
+        return f'"{self.mtime:x}-{self.size:x}"'
+
+
+def _key(name):
+    return f"media:{name}"
+
+
+def _allowed(name):
+    """Картинки существующих постов и миниатюры sorl."""
+    if name.startswith(sorl_settings.THUMBNAIL_PREFIX):
+        return True
+    return (name.startswith(UPLOADS_PREFIX)
+            and Post.objects.filter(image=name).exists())
+
+
+def lookup(name):
+    """Файл для раздачи или None, если его нет или отдавать нельзя."""
+    media = cache.get(_key(name))
+    if media is not None:
+        return media
+    # Проверка доступа идёт по префиксу, поэтому «..» и «//» запрещены.
+    if posixpath.normpath(name) != name:
+        return None
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        return None
+    if not _allowed(name):
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if not os.path.isfile(path):
+        return None
+    content_type, _ = mimetypes.guess_type(name)
+    media = MediaFile(name, path, stat.st_size, int(stat.st_mtime),
+                      content_type or "application/octet-stream")
+    cache.set(_key(name), media, MEDIA_LOOKUP_TIMEOUT)
+    return media
+
+
+def forget(name):
+    """Сбрасывает проверку файла, например после удаления поста."""
+    if name:
+        cache.delete(_key(name))
+
+
+def _accel_response(media):
+    response = HttpResponse(content_type=media.content_type)
+    if MEDIA_SERVER == "apache":
+        response["X-Sendfile"] = media.path
+    else:
+        response["X-Accel-Redirect"] = quote(MEDIA_ACCEL_PREFIX + media.name)
+    return response
+
+
+def _byte_range(request, media):
+    """``(start, end)`` единственного запрошенного диапазона или None.
+
+    Несколько диапазонов и устаревший If-Range дают целый файл, а
+    недостижимый диапазон — ``ValueError``.
+    """
+    match = RANGE_RE.match(request.META.get("HTTP_RANGE", ""))
+    if not match:
+        return None
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if if_range and if_range != media.etag:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last or not int(last):
+            raise ValueError
+        return max(media.size - int(last), 0), media.size - 1
+    start = int(first)
+    end = min(int(last), media.size - 1) if last else media.size - 1
+    if start > end:
+        raise ValueError
+    return start, end
+
+
+class _Slice:
+    """Часть файла для FileResponse."""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size):
+        data = self.file.read(min(size, self.remaining))
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _file_response(request, media):
+    try:
+        byte_range = _byte_range(request, media)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{media.size}"
+        return response
+    file = open(media.path, "rb")
+    if byte_range is None:
+        return FileResponse(file, content_type=media.content_type)
+    start, end = byte_range
+    file.seek(start)
+    response = FileResponse(_Slice(file, end - start + 1), status=206,
+                            content_type=media.content_type)
+    response["Content-Length"] = end - start + 1
+    response["Content-Range"] = f"bytes {start}-{end}/{media.size}"
+    return response
+
+
+@require_safe
+def serve(request, path):
+    """Отдаёт файл из MEDIA_ROOT после проверки доступа."""
+    media = lookup(path)
+    if media is None:
+        raise Http404
+    response = get_conditional_response(
+        request, etag=media.etag, last_modified=media.mtime)
+    if response is None:
+        if MEDIA_SERVER:
+            response = _accel_response(media)
+        else:
+            response = _file_response(request, media)
+    response["ETag"] = media.etag
+    response["Last-Modified"] = http_date(media.mtime)
+    response["Accept-Ranges"] = "bytes"
+    if response.status_code != 416:
+        patch_cache_control(response, public=True,
+                            max_age=MEDIA_CACHE_SECONDS, immutable=True)
+    return response
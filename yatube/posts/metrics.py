@@ -0,0 +1,372 @@
+"""Метрики запросов в формате Prometheus.
+
+``MetricsMiddleware`` для каждого имени URL считает задержку ответа,
+число и время SQL-запросов, время отрисовки шаблонов и обращения к кэшам.
+Каждый процесс копит метрики в памяти и не чаще раза в
+``METRICS_FLUSH_INTERVAL`` секунд записывает снимок в свой файл в
+``METRICS_DIR``. Страница ``/metrics`` складывает снимки всех процессов,
+поэтому для агрегации не нужен отдельный сервис.
+
+Снимок завершившегося процесса ``collect`` удаляет, как и любой снимок,
+не обновлявшийся ``METRICS_FILE_TTL`` секунд (процесс на другой машине с
+общим каталогом). Перед удалением его значения прибавляются к общему
+файлу ``retired.json``, поэтому счётчики не уменьшаются после перезапуска
+воркеров и Prometheus не видит ложных сбросов.
+"""
+import atexit
+import fcntl
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Имя метрики: (тип, описание, метки, границы корзин гистограммы).
+METRICS = {
+    "yatube_requests_total": (
+        "counter", "Обработанные запросы.", ("view", "method", "status"),
+        None),
+    "yatube_request_duration_seconds": (
+        "histogram", "Время обработки запроса.", ("view",), LATENCY_BUCKETS),
+    "yatube_db_queries": (
+        "histogram", "SQL-запросов на один запрос.", ("view",),
+        QUERY_BUCKETS),
+    "yatube_db_query_duration_seconds_total": (
+        "counter", "Суммарное время SQL-запросов.", ("view",), None),
+    "yatube_template_render_seconds": (
+        "histogram", "Время отрисовки шаблонов за запрос.", ("view",),
+        LATENCY_BUCKETS),
+    "yatube_cache_requests_total": (
+        "counter", "Обращения к кэшам.", ("view", "cache", "result"), None),
+    "yatube_image_bytes_total": (
+        "counter", "Байты загруженных картинок до и после обработки.",
+        ("stage",), None),
+}
+
+UNRESOLVED = "unresolved"
+# Сумма снимков завершившихся процессов и блокировка её обновления.
+RETIRED = "retired.json"
+LOCK = "collect.lock"
+
+
+def _metrics_dir():
+    return getattr(settings, "METRICS_DIR",
+                   os.path.join(tempfile.gettempdir(), "yatube-metrics"))
+
+
+def _flush_interval():
+    return getattr(settings, "METRICS_FLUSH_INTERVAL", 5)
+
+
+def _file_ttl():
+    return getattr(settings, "METRICS_FILE_TTL", 60 * 60)
+
+
+def authorized(request):
+    """Запрос несёт токен ``METRICS_TOKEN`` в заголовке Authorization."""
+    token = getattr(settings, "METRICS_TOKEN", "")
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    return bool(token) and hmac.compare_digest(header, f"Bearer {token}")
+
+
+class Registry:
+    """Метрики одного процесса.
+
+    Значение счётчика — число, гистограммы — список
+    ``[счётчики корзин..., сверх последней корзины, сумма]``.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def inc(self, metric, labels, amount=1):
+        key = (metric, tuple(labels))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, metric, labels, value):
+        buckets = METRICS[metric][3]
+        key = (metric, tuple(labels))
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [0] * (len(buckets) + 2)
+            index = next((i for i, bound in enumerate(buckets)
+                          if value <= bound), len(buckets))
+            counts[index] += 1
+            counts[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return [[metric, list(labels),
+                     list(value) if isinstance(value, list) else value]
+                    for (metric, labels), value in self.values.items()]
+
+    def merge(self, entries):
+        for metric, labels, value in entries:
+            if metric not in METRICS:
+                continue
+            key = (metric, tuple(labels))
+            current = self.values.get(key)
+            if current is None:
+                self.values[key] = value
+            elif isinstance(value, list):
+                self.values[key] = [a + b for a, b in zip(current, value)]
+            else:
+                self.values[key] = current + value
+
+
+class _Process:
+    """Реестр текущего процесса; после fork создаётся заново."""
+
+    def __init__(self):
+        self.pid = None
+        self.registry = None
+        self.path = None
+        self.flushed = 0.0
+
+    def get(self):
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.registry = Registry()
+            # Случайная часть имени не даёт новому процессу с тем же pid
+            # затереть накопленные счётчики прежнего.
+            self.path = f"{self.pid}-{uuid.uuid4().hex[:8]}.json"
+            self.flushed = time.monotonic()
+        return self.registry
+
+    def flush(self, force=False):
+        registry = self.get()
+        now = time.monotonic()
+        if not force and now - self.flushed < _flush_interval():
+            return
+        self.flushed = now
+        directory = _metrics_dir()
+        os.makedirs(directory, exist_ok=True)
+        _write(os.path.join(directory, self.path), registry.snapshot())
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _write(path, entries):
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(entries, file)
+    os.replace(temporary, path)
+
+
+_process = _Process()
+_local = threading.local()
+atexit.register(lambda: _process.pid and _process.flush(force=True))
+
+
+class _RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.render_time = 0.0
+        self.caches = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_time += time.perf_counter() - started
+
+
+def cache_result(name, hit):
+    """Отмечает попадание или промах кэша ``name`` в текущем запросе."""
+    current = getattr(_local, "request", None)
+    if current is not None:
+        current.caches.append((name, "hit" if hit else "miss"))
+
+
+def image_ingested(original_size, size):
+    """Учитывает размер загруженной картинки до и после обработки."""
+    registry = _process.get()
+    registry.inc("yatube_image_bytes_total", ("original",), original_size)
+    registry.inc("yatube_image_bytes_total", ("stored",), size)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            current = getattr(_local, "request", None)
+            if current is not None:
+                current.render_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблонный движок Django, замеряющий время отрисовки."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        current = _local.request = _RequestMetrics()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(current))
+                response = self.get_response(request)
+        finally:
+            _local.request = None
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else UNRESOLVED
+        page_cache = response.get("X-Page-Cache")
+        if page_cache:
+            # Устаревшая копия тоже отдана из кэша.
+            current.caches.append(
+                ("page", "miss" if page_cache == "miss" else "hit"))
+        self.record(view, request.method, response.status_code, elapsed,
+                    current)
+        return response
+
+    @staticmethod
+    def record(view, method, status, elapsed, current):
+        registry = _process.get()
+        registry.inc("yatube_requests_total", (view, method, str(status)))
+        registry.observe("yatube_request_duration_seconds", (view,), elapsed)
+        registry.observe("yatube_db_queries", (view,), current.queries)
+        registry.inc("yatube_db_query_duration_seconds_total", (view,),
+                     current.query_time)
+        registry.observe("yatube_template_render_seconds", (view,),
+                         current.render_time)
+        for name, result in current.caches:
+            registry.inc("yatube_cache_requests_total", (view, name, result))
+        _process.flush()
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _expired(name, path):
+    """Снимок больше не обновится: процесс завершился или давно молчит."""
+    pid = name.split("-", 1)[0]
+    if pid.isdigit() and int(pid) != os.getpid() and not _alive(int(pid)):
+        return True
+    return time.time() - os.stat(path).st_mtime > _file_ttl()
+
+
+def collect():
+    """Метрики всех процессов, записавших снимок в ``METRICS_DIR``.
+
+    Заодно переносит в ``RETIRED`` и удаляет снимки, которые больше не
+    обновятся. Всё это под блокировкой: иначе два одновременных сбора
+    могли бы прибавить один снимок дважды.
+    """
+    _process.flush(force=True)
+    directory = _metrics_dir()
+    retired_path = os.path.join(directory, RETIRED)
+    total, retired = Registry(), Registry()
+    with open(os.path.join(directory, LOCK), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            retired.merge(_read(retired_path))
+        except FileNotFoundError:
+            pass
+        expired = []
+        for name in sorted(os.listdir(directory)):
+            if (name.startswith(RETIRED)
+                    or not name.endswith((".json", ".json.tmp"))):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                entries = _read(path) if name.endswith(".json") else []
+                if _expired(name, path):
+                    retired.merge(entries)
+                    expired.append(path)
+                else:
+                    total.merge(entries)
+            except (OSError, ValueError):
+                continue
+        if expired:
+            _write(retired_path, retired.snapshot())
+            for path in expired:
+                os.remove(path)
+    total.merge(retired.snapshot())
+    return total
+
+
+def _escape(value):
+    return (value.replace("\\", "\\\\").replace("\n", "\\n")
+            .replace('"', '\\"'))
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"'
+                          for name, value in pairs) + "}"
+
+
+def _number(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def render(registry):
+    """Текстовый формат экспозиции Prometheus 0.0.4."""
+    lines = []
+    for metric, (kind, description, names, buckets) in METRICS.items():
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} {kind}")
+        series = sorted((labels, value)
+                        for (name, labels), value in registry.values.items()
+                        if name == metric)
+        for labels, value in series:
+            if kind != "histogram":
+                lines.append(f"{metric}{_labels(names, labels)} "
+                             f"{_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, "+Inf"), value[:-1]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(bound)
+                lines.append(f"{metric}_bucket"
+                             f"{_labels(names, labels, [('le', le)])} "
+                             f"{cumulative}")
+            lines.append(f"{metric}_sum{_labels(names, labels)} "
+                         f"{_number(value[-1])}")
+            lines.append(f"{metric}_count{_labels(names, labels)} "
+                         f"{cumulative}")
+    return "\n".join(lines) + "\n"
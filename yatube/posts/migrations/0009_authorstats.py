@@ -0,0 +1,42 @@
+# Generated by Django 2.2.6 on 2026-10-17 07:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    users = User.objects.annotate(
+        posts_total=models.Count('posts', distinct=True),
+        followers_total=models.Count('following', distinct=True),
+        following_total=models.Count('follower', distinct=True),
+    ).values_list('pk', 'posts_total', 'followers_total', 'following_total')
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=pk, posts_count=posts,
+                     followers_count=followers, following_count=following)
+         for pk, posts, followers, following in users.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0008_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+                ('followers_count', models.PositiveIntegerField(default=0)),
+                ('following_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
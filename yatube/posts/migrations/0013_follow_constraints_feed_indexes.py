@@ -0,0 +1,66 @@
+# Generated by Django 2.2.6 on 2026-10-17 07:39
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+def dedupe_follows(apps, schema_editor):
+    """Удаляет повторы и подписки на себя, чинит ленты и счётчики."""
+    Follow = apps.get_model('posts', 'Follow')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    duplicates = Follow.objects.values('user', 'author').annotate(
+        keep=models.Min('pk'), total=models.Count('pk'),
+    ).filter(total__gt=1)
+    affected = set()
+    for row in duplicates.iterator():
+        Follow.objects.filter(user=row['user'], author=row['author']).exclude(
+            pk=row['keep']).delete()
+        affected.update((row['user'], row['author']))
+    self_follows = Follow.objects.filter(user=models.F('author'))
+    self_followers = set(self_follows.values_list('user', flat=True))
+    affected.update(self_followers)
+    self_follows.delete()
+    # Подписка на себя разложила собственные посты в ленту автора.
+    TimelineEntry.objects.filter(
+        user_id__in=self_followers, author=models.F('user')).delete()
+    for user_id in affected:
+        AuthorStats.objects.filter(user_id=user_id).update(
+            followers_count=Follow.objects.filter(author_id=user_id).count(),
+            following_count=Follow.objects.filter(user_id=user_id).count(),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_follows, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['author', 'user'], name='follow_author_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='post_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date', '-id'], name='post_group_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(check=models.Q(_negated=True, user=django.db.models.expressions.F('author')), name='prevent_self_follow'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.6 on 2026-10-17 09:10
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+# Как и в 0014: SQLite пересоздаёт posts_post и теряет триггеры поиска.
+restore_fts_triggers = import_module(
+    'posts.migrations.0014_post_updated').restore_fts_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_fts_triggers),
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+    ]
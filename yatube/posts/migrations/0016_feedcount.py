@@ -0,0 +1,26 @@
+# Generated by Django 2.2.6 on 2026-10-17 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=16)),
+                ('key', models.PositiveIntegerField(default=0)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='feedcount',
+            constraint=models.UniqueConstraint(fields=('kind', 'key'), name='unique_feed_count'),
+        ),
+    ]
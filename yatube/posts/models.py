@@ -1,5 +1,14 @@
+import json
+
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import (Count, F, IntegerField, Lookup, OuterRef, Q,
+                              Subquery)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import images
 
 User = get_user_model()
 
@@ -13,7 +22,24 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def with_feed_data(self):
+        """Автор, группа и число комментариев одним запросом."""
+        comment_count = Comment.objects.filter(
+            post=OuterRef("pk")
+        ).order_by().values("post").annotate(
+            count=Count("pk")
+        ).values("count")
+        return self.select_related("author", "group").annotate(
+            comment_count=Coalesce(Subquery(comment_count,
+                                            output_field=IntegerField()), 0)
+        )
+
+
 class Post(models.Model):
+    # Изменение схемы posts_post на SQLite пересоздаёт таблицу без
+    # триггеров индекса поиска: их возвращает search.restore_triggers
+    # после каждого migrate.
     text = models.TextField()
     pub_date = models.DateTimeField("date published",
                                     auto_now_add=True,
@@ -26,13 +52,83 @@ class Post(models.Model):
                               related_name="posts",
                               blank=True, null=True,)
     image = models.ImageField(upload_to="posts/", blank=True, null=True)
+    # Размеры картинки. Не width_field/height_field: те при создании
+    # объекта открывают файл, если размеры ещё не заполнены.
+    image_width = models.PositiveIntegerField(null=True, blank=True,
+                                              editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True,
+                                               editable=False)
+    # Миниатюра для ленты уже посчитана, см. posts.thumbnails.
+    thumbnail_ready = models.BooleanField(default=False, editable=False)
+    # Варианты миниатюры ленты и размытая заглушка в JSON, см. feed_image.
+    image_variants = models.TextField(blank=True, default="",
+                                      editable=False)
+    # Растёт при правке поста и новых комментариях, см. posts.cards.
+    version = models.PositiveIntegerField(default=1, editable=False)
+    # Время последнего изменения версии, для Last-Modified.
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ["-pub_date"]
+        # Ленты автора и группы читаются диапазоном по индексу уже в
+        # порядке FEED_ORDERING, без сортировки всех постов.
+        indexes = [
+            models.Index(fields=["author", "-pub_date", "-id"],
+                         name="post_author_pub_date_idx"),
+            models.Index(fields=["group", "-pub_date", "-id"],
+                         name="post_group_pub_date_idx"),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        # Новая загрузка ещё не в хранилище: уменьшаем и перекодируем её.
+        if self.image and not self.image._committed:
+            ingested = images.ingest(self.image.file)
+            self.image = ingested.file
+            self.image_width, self.image_height = (ingested.width,
+                                                   ingested.height)
+            self.image_variants = ""
+        elif not self.image:
+            self.image_width = self.image_height = None
+            self.image_variants = ""
+        if (not self._state.adding and not args
+                and not kwargs.get("force_insert")
+                and kwargs.get("update_fields") is None):
+            # version и updated меняет только атомарный bump_version после
+            # сохранения: значения из памяти откатили бы чужое увеличение
+            # версии (комментарий, миниатюра), и карточка не обновилась бы.
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in ("version", "updated")
+            ]
+        super().save(*args, **kwargs)
+
+    @cached_property
+    def feed_image(self):
+        """Варианты миниатюры ленты для srcset без обращения к хранилищу.
+
+        ``{"sizes": [{"url", "width", "height"}, ...], "src": самый
+        крупный вариант, "placeholder": data: URI}`` или None, пока
+        варианты не посчитаны.
+        """
+        if not self.image or not self.image_variants:
+            return None
+        data = json.loads(self.image_variants)
+        storage = self.image.storage
+        sizes = [{"url": storage.url(name), "width": width, "height": height}
+                 for name, width, height in data["sizes"]]
+        return {"sizes": sizes, "src": sizes[-1],
+                "placeholder": data["placeholder"]}
+
+    def bump_version(self):
+        Post.objects.filter(pk=self.pk).update(version=F("version") + 1,
+                                               updated=timezone.now())
+
 
 class Comment(models.Model):
     post = models.ForeignKey(Post,
@@ -44,6 +140,12 @@ class Comment(models.Model):
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["post", "created"],
+                         name="comment_post_created_idx"),
+        ]
+
 
 class Follow(models.Model):
     user = models.ForeignKey(User,
@@ -52,3 +154,103 @@ class Follow(models.Model):
     author = models.ForeignKey(User,
                                on_delete=models.CASCADE,
                                related_name="following")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "author"],
+                                    name="unique_follow"),
+            models.CheckConstraint(check=~Q(user=F("author")),
+                                   name="prevent_self_follow"),
+        ]
+        # Подписчики автора: fan-out и счётчики читают подписки по author.
+        indexes = [
+            models.Index(fields=["author", "user"],
+                         name="follow_author_user_idx"),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписчика, разложенный при публикации (fan-out)."""
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name="timeline")
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name="timeline_entries")
+    author = models.ForeignKey(User,
+                               on_delete=models.CASCADE,
+                               related_name="+")
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-pub_date", "-post_id"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "post"],
+                                    name="unique_timeline_entry"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-pub_date", "-post"],
+                         name="timeline_user_pub_date_idx"),
+            models.Index(fields=["user", "author"],
+                         name="timeline_user_author_idx"),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Счётчики автора, поддерживаемые при изменении постов и подписок."""
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name="stats")
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+
+class FeedCount(models.Model):
+    """Число постов в ленте, см. posts.counts.
+
+    ``key`` — id группы для ``group``, id читателя для ``follow`` и 0 для
+    общей ленты. Лента автора считается в ``AuthorStats.posts_count``.
+    """
+    kind = models.CharField(max_length=16)
+    key = models.PositiveIntegerField(default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "key"],
+                                    name="unique_feed_count"),
+        ]
+
+
+class SearchTextField(models.TextField):
+    """Колонка полнотекстового индекса; поддерживает поиск ``__match``."""
+
+
+@SearchTextField.register_lookup
+class Match(Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class PostSearchIndex(models.Model):
+    """Индекс FTS5 по тексту постов.
+
+    Виртуальная таблица создаётся миграцией и обновляется триггерами на
+    ``posts_post``, поэтому Django ею не управляет.
+    """
+    post = models.OneToOneField(Post,
+                                on_delete=models.DO_NOTHING,
+                                primary_key=True,
+                                db_column="rowid",
+                                related_name="search_index")
+    text = SearchTextField()
+
+    class Meta:
+        managed = False
+        db_table = "posts_post_fts"
@@ -0,0 +1,326 @@
+"""Уведомления о новых постах через Server-Sent Events.
+
+Воркеры WSGI после коммита шлют о новом посте одну датаграмму в
+локальный Unix-сокет ``NOTIFY_SOCKET``: отправка не блокирует запрос,
+и если сервер уведомлений не запущен, сообщение просто теряется.
+
+Сервер — один процесс на asyncio (``python -m yatube.sse``). Он читает
+датаграммы и раздаёт их открытым потокам ``GET /events/``. Каждое
+соединение — сопрограмма и короткая очередь, а не поток или воркер,
+поэтому тысячи ждущих клиентов почти ничего не стоят. Поток подписан на
+области ``Hub``:
+
+* ``?feed=index`` — все посты;
+* ``?feed=group&group=<slug>`` — посты группы;
+* ``?feed=follow`` — посты авторов, на которых подписан вошедший
+  читатель; список авторов читается при подключении.
+
+Событие ``post`` несёт id поста. Последние ``NOTIFY_HISTORY`` событий
+хранятся, и переподключившийся клиент получает пропущенные после
+``Last-Event-ID``. Раз в ``NOTIFY_HEARTBEAT`` секунд всем уходит
+комментарий, чтобы прокси не закрывали соединение, а мёртвые
+соединения обнаруживались. Клиент, который не успевает читать, отключается.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+from collections import deque
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+from .models import Follow
+
+NOTIFY_SOCKET = getattr(settings, "NOTIFY_SOCKET",
+                        os.path.join(settings.BASE_DIR, "notify.sock"))
+NOTIFY_HEARTBEAT = getattr(settings, "NOTIFY_HEARTBEAT", 15)
+NOTIFY_HISTORY = getattr(settings, "NOTIFY_HISTORY", 1000)
+NOTIFY_QUEUE_SIZE = getattr(settings, "NOTIFY_QUEUE_SIZE", 64)
+NOTIFY_RETRY_MS = getattr(settings, "NOTIFY_RETRY_MS", 5000)
+
+EVENTS_PATH = "/events/"
+HEADER_LIMIT = 8192
+HEADER_TIMEOUT = 10
+
+logger = logging.getLogger(__name__)
+
+_sender = None
+
+
+def scopes_for(post):
+    """Области, в которых виден пост."""
+    scopes = ["index", f"author:{post.author_id}"]
+    if post.group_id:
+        scopes.append(f"group:{post.group.slug}")
+    return scopes
+
+
+def publish(post):
+    """Объявляет новый пост после коммита транзакции."""
+    message = json.dumps({"id": post.id, "scopes": scopes_for(post)})
+    transaction.on_commit(lambda: send(message.encode()))
+
+
+def send(data, path=None):
+    """Отправляет датаграмму серверу уведомлений, не дожидаясь его."""
+    global _sender
+    if _sender is None:
+        _sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        _sender.setblocking(False)
+    try:
+        _sender.sendto(data, path or NOTIFY_SOCKET)
+    except OSError as error:
+        logger.debug("Уведомление не отправлено: %s", error)
+
+
+class Subscription:
+    """Очередь событий одного потока и его области."""
+
+    def __init__(self, scopes, queue_size):
+        self.scopes = frozenset(scopes)
+        self.queue = asyncio.Queue(queue_size)
+        self.dropped = False
+
+    def offer(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Клиент не читает: поток закроется, клиент переподключится
+            # и доберёт пропущенное по Last-Event-ID.
+            self.dropped = True
+
+
+class Hub:
+    """Подписчики по областям и недавние события для переподключений."""
+
+    def __init__(self, history=NOTIFY_HISTORY, queue_size=NOTIFY_QUEUE_SIZE):
+        self.by_scope = {}
+        self.subscriptions = set()
+        self.history = deque(maxlen=history)
+        self.queue_size = queue_size
+
+    def subscribe(self, scopes, last_id=None):
+        subscription = Subscription(scopes, self.queue_size)
+        self.subscriptions.add(subscription)
+        for scope in subscription.scopes:
+            self.by_scope.setdefault(scope, set()).add(subscription)
+        if last_id is not None:
+            for post_id, post_scopes in self.history:
+                if post_id > last_id and post_scopes & subscription.scopes:
+                    subscription.offer(post_id)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+        for scope in subscription.scopes:
+            subscriptions = self.by_scope.get(scope)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.by_scope[scope]
+
+    def publish(self, post_id, scopes):
+        self.history.append((post_id, frozenset(scopes)))
+        targets = set()
+        for scope in scopes:
+            targets.update(self.by_scope.get(scope, ()))
+        for subscription in targets:
+            subscription.offer(post_id)
+
+    def ping(self):
+        for subscription in self.subscriptions:
+            subscription.offer(None)
+
+    def datagram_received(self, data):
+        try:
+            message = json.loads(data)
+            self.publish(int(message["id"]), list(message["scopes"]))
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Непонятное уведомление: %r", data[:200])
+
+
+class _Receiver(asyncio.DatagramProtocol):
+    def __init__(self, hub):
+        self.hub = hub
+
+    def datagram_received(self, data, addr):
+        self.hub.datagram_received(data)
+
+
+def reader_scopes(session_key):
+    """Области ленты подписок читателя по cookie сессии или None."""
+    engine = import_string(f"{settings.SESSION_ENGINE}.SessionStore")
+    user = get_user(SimpleNamespace(session=engine(session_key)))
+    if not user.is_authenticated:
+        return None
+    authors = Follow.objects.filter(user=user).values_list(
+        "author_id", flat=True)
+    return [f"author:{author_id}" for author_id in authors]
+
+
+def _load_reader_scopes(session_key):
+    # Поток пула сервера живёт долго: соединения закрываются, как после
+    # запроса.
+    close_old_connections()
+    try:
+        return reader_scopes(session_key)
+    finally:
+        close_old_connections()
+
+
+def _parse_request(head):
+    lines = head.decode("latin-1").split("\r\n")
+    method, target, _ = lines[0].split(" ", 2)
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return method, urlsplit(target), headers
+
+
+def _session_key(headers):
+    for chunk in headers.get("cookie", "").split(";"):
+        name, _, value = chunk.strip().partition("=")
+        if name == settings.SESSION_COOKIE_NAME:
+            return value
+    return None
+
+
+def _response(writer, status, body=b""):
+    writer.write(f"HTTP/1.1 {status}\r\nContent-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode() + body)
+
+
+async def _scopes(url, headers):
+    params = parse_qs(url.query)
+    feed = params.get("feed", ["index"])[0]
+    if feed == "index":
+        return ["index"]
+    if feed == "group" and params.get("group"):
+        return [f"group:{params['group'][0]}"]
+    if feed == "follow":
+        session_key = _session_key(headers)
+        if session_key:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, _load_reader_scopes,
+                                              session_key)
+    return None
+
+
+async def handle(hub, reader, writer):
+    """Обслуживает одно соединение: разбор запроса и поток событий.
+
+    Отмена (остановка сервера) не глушится: соединение закрывается, а
+    ``CancelledError`` уходит дальше.
+    """
+    try:
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"),
+                                          HEADER_TIMEOUT)
+            method, url, headers = _parse_request(head)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                asyncio.LimitOverrunError, ValueError):
+            return
+        if method != "GET" or url.path != EVENTS_PATH:
+            _response(writer, "404 Not Found")
+            return
+        scopes = await _scopes(url, headers)
+        if scopes is None:
+            _response(writer, "403 Forbidden")
+            return
+        last_id = headers.get("last-event-id", "")
+        subscription = hub.subscribe(
+            scopes, int(last_id) if last_id.isdigit() else None)
+        try:
+            await _stream(writer, subscription)
+        finally:
+            hub.unsubscribe(subscription)
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def _stream(writer, subscription):
+    writer.write(b"HTTP/1.1 200 OK\r\n"
+                 b"Content-Type: text/event-stream\r\n"
+                 b"Cache-Control: no-cache\r\n"
+                 b"X-Accel-Buffering: no\r\n"
+                 b"Connection: close\r\n\r\n"
+                 + f"retry: {NOTIFY_RETRY_MS}\n\n".encode())
+    await writer.drain()
+    while not subscription.dropped:
+        post_id = await subscription.queue.get()
+        if post_id is None:
+            writer.write(b": ping\n\n")
+        else:
+            data = json.dumps({"id": post_id})
+            writer.write(f"id: {post_id}\nevent: post\ndata: {data}\n\n"
+                         .encode())
+        await writer.drain()
+
+
+async def _heartbeat(hub, interval):
+    while True:
+        await asyncio.sleep(interval)
+        hub.ping()
+
+
+class Server:
+    """Сервер уведомлений: приём датаграмм, HTTP-потоки и пульс."""
+
+    def __init__(self, hub=None, host="127.0.0.1", port=8001,
+                 path=NOTIFY_SOCKET, heartbeat=NOTIFY_HEARTBEAT):
+        self.hub = hub or Hub()
+        self.host, self.port = host, port
+        self.path = path
+        self.heartbeat = heartbeat
+        self.connections = set()
+
+    def _accept(self, reader, writer):
+        # Задачу создаём сами, а не отдаём сопрограмму start_server: так
+        # close может отменить открытые потоки и дождаться их закрытия.
+        task = asyncio.get_running_loop().create_task(
+            handle(self.hub, reader, writer))
+        self.connections.add(task)
+        task.add_done_callback(self.connections.discard)
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(self.path)
+        self.receiver, _ = await loop.create_datagram_endpoint(
+            lambda: _Receiver(self.hub), sock=sock)
+        self.server = await asyncio.start_server(
+            self._accept, self.host, self.port, limit=HEADER_LIMIT,
+            backlog=1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.pulse = loop.create_task(_heartbeat(self.hub, self.heartbeat))
+
+    async def close(self):
+        self.pulse.cancel()
+        self.receiver.close()
+        self.server.close()
+        for task in self.connections:
+            task.cancel()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.server.wait_closed()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def serve_forever(self):
+        await self.start()
+        logger.info("Уведомления: http://%s:%s%s, сокет %s",
+                    self.host, self.port, EVENTS_PATH, self.path)
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
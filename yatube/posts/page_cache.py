@@ -0,0 +1,164 @@
+"""Кэш страниц лент, сбрасываемый событиями.
+
+У каждой области (главная, группа, профиль) есть поколение — случайная
+метка в кэше. Страница хранится вместе с поколением, при котором она
+отрисована; ``invalidate`` меняет метку, и все страницы области сразу
+считаются устаревшими. Устаревшую копию отдают всем, пока один процесс,
+взявший блокировку, отрисовывает новую.
+
+Анонимные страницы общие для всех посетителей и не зависят от cookies.
+Страницы вошедшего пользователя хранятся отдельно для каждой его сессии:
+при входе Django меняет и сессию, и CSRF-токен, который есть в разметке.
+
+Метка хранит и время сброса. Страницу, которую перерисовывают вскоре
+после сброса, читают из основной базы: реплика может ещё не знать об
+изменении, и устаревшая копия попала бы в кэш всем читателям.
+
+Сброс виден другим воркерам, только если кэш общий (Redis, memcached,
+база). С ``LocMemCache`` у каждого процесса свои метки, поэтому там
+копия считается свежей не дольше ``PAGE_CACHE_LOCAL_TIMEOUT`` секунд.
+"""
+import hashlib
+import time
+import uuid
+from contextlib import nullcontext
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+
+from . import replicas
+
+PAGE_CACHE_TIMEOUT = getattr(settings, "PAGE_CACHE_TIMEOUT", 60 * 10)
+PAGE_CACHE_STALE_TIMEOUT = getattr(settings, "PAGE_CACHE_STALE_TIMEOUT",
+                                   60 * 60 * 24)
+PAGE_CACHE_LOCK_TIMEOUT = getattr(settings, "PAGE_CACHE_LOCK_TIMEOUT", 30)
+PAGE_CACHE_LOCAL_TIMEOUT = getattr(settings, "PAGE_CACHE_LOCAL_TIMEOUT", 20)
+
+
+def index_scope():
+    return "index"
+
+
+def group_scope(slug):
+    return f"group:{slug}"
+
+
+def profile_scope(username):
+    return f"profile:{username}"
+
+
+def _generation_key(scope):
+    return f"page-cache:gen:{scope}"
+
+
+def _new_generation():
+    return f"{uuid.uuid4().hex}:{time.time()}"
+
+
+def _changed_at(generation):
+    _, _, changed = generation.partition(":")
+    return float(changed or 0)
+
+
+def _generation(scope):
+    key = _generation_key(scope)
+    generation = cache.get(key)
+    if generation is None:
+        # Потерянная метка заменяется новой, поэтому старые копии
+        # не могут случайно снова стать свежими.
+        cache.add(key, _new_generation(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def fresh_timeout():
+    """Сколько копия страницы считается свежей при текущем кэше."""
+    if isinstance(caches["default"], LocMemCache):
+        return min(PAGE_CACHE_TIMEOUT, PAGE_CACHE_LOCAL_TIMEOUT)
+    return PAGE_CACHE_TIMEOUT
+
+
+def invalidate(*scopes):
+    cache.set_many({_generation_key(scope): _new_generation()
+                    for scope in scopes}, None)
+
+
+def post_scopes(post):
+    """Области страниц, на которых виден пост."""
+    scopes = [index_scope(), profile_scope(post.author.username)]
+    if post.group:
+        scopes.append(group_scope(post.group.slug))
+    return scopes
+
+
+def invalidate_post(post):
+    """Сбрасывает страницы, на которых виден пост."""
+    invalidate(*post_scopes(post))
+
+
+def audience(request):
+    """Кому предназначена страница: всем анонимам или одной сессии."""
+    if not request.user.is_authenticated:
+        return "anon"
+    session_key = request.session.session_key
+    if session_key is None:
+        return None
+    digest = hashlib.md5(session_key.encode()).hexdigest()
+    return f"user:{request.user.pk}:{digest}"
+
+
+def _page_key(scope, reader, request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"page-cache:page:{scope}:{reader}:{path}"
+
+
+def _to_response(entry):
+    response = HttpResponse(entry["content"],
+                            content_type=entry["content_type"])
+    response["X-Page-Cache"] = "hit" if entry["fresh"] else "stale"
+    return response
+
+
+def cached_page(scope_for):
+    """Кэширует GET-ответы представления в области ``scope_for(**kwargs)``."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            reader = audience(request)
+            if reader is None:
+                return view(request, *args, **kwargs)
+            scope = scope_for(**kwargs)
+            generation = _generation(scope)
+            key = _page_key(scope, reader, request)
+            entry = cache.get(key)
+            if entry is not None:
+                entry["fresh"] = (entry["generation"] == generation
+                                  and entry["expires"] > time.time())
+                if entry["fresh"]:
+                    return _to_response(entry)
+                if not cache.add(f"{key}:lock", 1, PAGE_CACHE_LOCK_TIMEOUT):
+                    return _to_response(entry)
+            recent = (time.time() - _changed_at(generation)
+                      < replicas.PRIMARY_STICKY_SECONDS)
+            try:
+                with replicas.use_primary() if recent else nullcontext():
+                    response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming:
+                    response["X-Page-Cache"] = "miss"
+                    cache.set(key, {
+                        "generation": generation,
+                        "expires": time.time() + fresh_timeout(),
+                        "content": response.content,
+                        "content_type": response["Content-Type"],
+                    }, PAGE_CACHE_STALE_TIMEOUT)
+            finally:
+                if entry is not None:
+                    cache.delete(f"{key}:lock")
+            return response
+        return wrapper
+    return decorator
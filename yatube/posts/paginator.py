@@ -0,0 +1,271 @@
+import base64
+import binascii
+import copy
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+POSTS_PER_PAGE = 10
+# Сколько соседних номеров показывать по обе стороны от текущего.
+PAGE_NEIGHBOURS = getattr(settings, "PAGE_NEIGHBOURS", 2)
+PAGE_COUNT_TIMEOUT = getattr(settings, "PAGE_COUNT_TIMEOUT", 60 * 10)
+FEED_ORDERING = ("-pub_date", "-id")
+TIMELINE_ORDERING = ("-pub_date", "-post_id")
+COMMENTS_PER_PAGE = 20
+COMMENT_ORDERING = ("created", "id")
+
+
+class CursorPaginator(Paginator):
+    """Паджинатор по ключу (keyset) вместо COUNT(*) и OFFSET.
+
+    Страница выбирается условием вида ``(pub_date, id) < (курсор)`` по
+    упорядоченным полям, поэтому любая страница отдаётся за одно обращение
+    к индексу, независимо от её глубины.
+
+    ``get_page`` возвращает обычный ``Page``, чтобы шаблоны работали без
+    изменений. Настоящий номер страницы неизвестен: ``number`` равен 2,
+    если перед страницей есть записи, и ``num_pages`` на единицу больше,
+    если есть записи после неё. Курсоры соседних страниц лежат в
+    ``page.previous_cursor`` и ``page.next_cursor``.
+    """
+
+    cursor_based = True
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING):
+        self.ordering = tuple(ordering)
+        super().__init__(object_list.order_by(*self.ordering), per_page)
+        self.fields = [name.lstrip("-") for name in self.ordering]
+        self.descending = self.ordering[0].startswith("-")
+
+    def encode_cursor(self, obj, reverse=False):
+        values = [self._field_to_string(obj, name) for name in self.fields]
+        raw = "|".join(["r" if reverse else "n"] + values)
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        except (binascii.Error, UnicodeError, ValueError):
+            return None
+        direction, *values = raw.split("|")
+        if direction not in ("n", "r") or len(values) != len(self.fields):
+            return None
+        try:
+            values = [self._to_python(name, value)
+                      for name, value in zip(self.fields, values)]
+        except Exception:
+            return None
+        return direction == "r", values
+
+    def _to_python(self, name, value):
+        annotations = self.object_list.query.annotations
+        if name in annotations:
+            return annotations[name].output_field.to_python(value)
+        return self.object_list.model._meta.get_field(name).to_python(value)
+
+    def get_page(self, cursor):
+        items, has_previous, has_next = self._window(cursor,
+                                                     self.object_list)
+        return self._build_page(items, has_previous, has_next)
+
+    def page_rows(self, cursor, fields):
+        """Значения ``fields`` записей страницы и соседней за ней.
+
+        Тот же запрос по ключу, что и у ``get_page``, но без объектов
+        моделей — на нём строятся дешёвые валидаторы ETag.
+        """
+        queryset = self.object_list.values_list(*fields)
+        items, has_previous, has_next = self._window(cursor, queryset,
+                                                     extra=True)
+        return items
+
+    def _window(self, cursor, queryset, extra=False):
+        """Записи страницы и признаки соседних страниц.
+
+        С ``extra`` в список попадает и запись, по которой узнают о
+        следующей (или предыдущей) странице.
+        """
+        limit = None if extra else self.per_page
+        position = self.decode_cursor(cursor) if cursor else None
+        if position is None:
+            items = self._fetch(queryset, self.ordering)
+            return items[:limit], False, len(items) > self.per_page
+        if position[0]:
+            items = self._fetch(queryset, self._reversed_ordering(),
+                                position[1], not self.descending)
+            return (items[:limit][::-1], len(items) > self.per_page, True)
+        items = self._fetch(queryset, self.ordering, position[1],
+                            self.descending)
+        return items[:limit], True, len(items) > self.per_page
+
+    def _fetch(self, queryset, ordering, values=None, descending=None):
+        if values is not None:
+            queryset = queryset.filter(self._keyset_filter(values, descending))
+        return list(queryset.order_by(*ordering)[:self.per_page + 1])
+
+    def _build_page(self, items, has_previous, has_next):
+        # У каждой страницы своя копия паджинатора: num_pages описывает
+        # только её соседей.
+        paginator = copy.copy(self)
+        number = 2 if has_previous else 1
+        paginator.__dict__["num_pages"] = number + int(has_next)
+        page = Page(items, number, paginator)
+        page.previous_cursor = (self.encode_cursor(items[0], reverse=True)
+                                if has_previous and items else None)
+        page.next_cursor = (self.encode_cursor(items[-1])
+                            if has_next and items else None)
+        return page
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith("-") else f"-{name}"
+                for name in self.ordering]
+
+    def _keyset_filter(self, values, descending):
+        """Лексикографическое сравнение кортежа полей с курсором."""
+        lookup = "lt" if descending else "gt"
+        condition = Q()
+        for index, name in enumerate(self.fields):
+            step = Q(**{f"{name}__{lookup}": values[index]})
+            for prev_name, prev_value in zip(self.fields[:index],
+                                             values[:index]):
+                step &= Q(**{prev_name: prev_value})
+            condition |= step
+        return condition
+
+    @staticmethod
+    def _field_to_string(obj, name):
+        value = getattr(obj, name)
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        return str(value)
+
+
+class WindowedPaginator(Paginator):
+    """Нумерованные страницы без точного ``COUNT(*)`` на каждый запрос.
+
+    Вместе со страницей выбираются ключи следующих ``neighbours``
+    страниц: так известно, сколько их ещё есть рядом. Номер последней
+    страницы берётся из ``count()`` — обычно счётчика ленты из
+    ``posts.counts``, — а без него из ``COUNT(*)``, который считается
+    раз в ``PAGE_COUNT_TIMEOUT`` и лежит в кэше. Ссылка на последнюю
+    страницу ведёт на существующую, даже если число устарело.
+
+    В ``page.navigation`` — номера для навигации: первая и последняя
+    страницы, соседи текущей и ``None`` на месте пропуска. Их число не
+    зависит от размера ленты.
+    """
+
+    def __init__(self, object_list, per_page, neighbours=PAGE_NEIGHBOURS,
+                 count=None):
+        super().__init__(object_list, per_page)
+        self.neighbours = neighbours
+        self.counter = count
+
+    def get_page(self, number):
+        number, items, last = self._locate(self.object_list, number)
+        return self._build_page(items, number, last)
+
+    def page_rows(self, number, fields):
+        """Значения ``fields`` записей страницы и номера её навигации."""
+        queryset = self.object_list.values_list(*fields)
+        number, items, last = self._locate(queryset, number)
+        return items, (number, last)
+
+    def _locate(self, queryset, number):
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        items = self._slice(queryset, number)
+        if not items and number > 1:
+            number = max(-(-self.estimated_count() // self.per_page), 1)
+            items = self._slice(queryset, number)
+        if not items and number > 1:
+            # Оценка разошлась с лентой: нужен точный счёт.
+            number = max(-(-self.count // self.per_page), 1)
+            items = self._slice(queryset, number)
+        return number, items, self._last_page(number)
+
+    def _slice(self, queryset, number):
+        bottom = (number - 1) * self.per_page
+        return list(queryset[bottom:bottom + self.per_page])
+
+    def _last_page(self, number):
+        window = self.per_page * self.neighbours
+        top = number * self.per_page
+        ahead = len(self.object_list.values_list("pk", flat=True)
+                    [top:top + window + 1])
+        if ahead <= window:
+            return number + -(-ahead // self.per_page)
+        estimate = -(-self.estimated_count() // self.per_page)
+        return max(estimate, number + self.neighbours + 1)
+
+    def estimated_count(self):
+        """Число записей: из счётчика или из кэша ``COUNT(*)``."""
+        if self.counter is not None:
+            return self.counter()
+        query = str(self.object_list.query).encode()
+        key = f"paginator:count:{hashlib.md5(query).hexdigest()}"
+        return cache.get_or_set(key, self.object_list.count,
+                                PAGE_COUNT_TIMEOUT)
+
+    def _build_page(self, items, number, last):
+        paginator = copy.copy(self)
+        paginator.__dict__["num_pages"] = last
+        page = Page(items, number, paginator)
+        page.navigation = page_window(number, last, self.neighbours)
+        return page
+
+
+def page_window(number, last, neighbours=PAGE_NEIGHBOURS):
+    """Номера страниц вокруг ``number`` и ``None`` на месте пропусков.
+
+        >>> page_window(50, 100)
+        [1, None, 48, 49, 50, 51, 52, None, 100]
+    """
+    shown = {1, last, *range(max(number - neighbours, 1),
+                             min(number + neighbours, last) + 1)}
+    window = []
+    for page in sorted(shown):
+        if window and page - window[-1] == 2:
+            window.append(page - 1)
+        elif window and page - window[-1] > 2:
+            window.append(None)
+        window.append(page)
+    return window
+
+
+def paginate(request, object_list, per_page=POSTS_PER_PAGE,
+             ordering=FEED_ORDERING, count=None):
+    """Страница ленты для запроса.
+
+    По умолчанию лента листается курсором (``?cursor=``). Параметр
+    ``?page=N`` включает старую нумерованную паджинацию; ``count`` —
+    функция, возвращающая число записей, см. ``posts.counts.counter``.
+    """
+    page_number = request.GET.get("page")
+    if page_number is not None:
+        paginator = WindowedPaginator(object_list.order_by(*ordering),
+                                      per_page, count=count)
+        return paginator.get_page(page_number)
+    paginator = CursorPaginator(object_list, per_page, ordering)
+    return paginator.get_page(request.GET.get("cursor"))
+
+
+def page_rows(request, object_list, fields, per_page=POSTS_PER_PAGE,
+              ordering=FEED_ORDERING, count=None):
+    """Значения ``fields`` записей страницы, которую вернёт ``paginate``.
+
+    Возвращает строки и то, что ещё видно в навигации: для нумерованной
+    страницы — её номер и номер последней.
+    """
+    page_number = request.GET.get("page")
+    if page_number is not None:
+        paginator = WindowedPaginator(object_list.order_by(*ordering),
+                                      per_page, count=count)
+        return paginator.page_rows(page_number, fields)
+    paginator = CursorPaginator(object_list, per_page, ordering)
+    return paginator.page_rows(request.GET.get("cursor"), fields), ()
@@ -0,0 +1,107 @@
+"""Чтение постов с реплик, запись — в основную базу.
+
+``PrimaryReplicaRouter`` отправляет чтение моделей приложения posts на
+одну из баз ``DATABASE_REPLICAS``, а любую запись — в ``default``. Реплика
+отстаёт от основной базы, поэтому читают из основной:
+
+* внутри транзакции — иначе запрос не увидит свои же изменения;
+* до конца запроса или фоновой задачи (блок ``scope()``), в которых уже
+  была запись;
+* ``PRIMARY_STICKY_SECONDS`` после записи: ``PrimaryStickyMiddleware``
+  ставит cookie с моментом, до которого запросы пользователя закреплены
+  за основной базой, и автор сразу видит свой пост или комментарий;
+* в блоке ``use_primary()``.
+
+Без ``DATABASE_REPLICAS`` всё чтение идёт в ``default``.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PRIMARY_STICKY_SECONDS = getattr(settings, "PRIMARY_STICKY_SECONDS", 10)
+STICKY_COOKIE = "primary_until"
+REPLICATED_APPS = {"posts"}
+
+_local = threading.local()
+
+
+def replicas():
+    return list(getattr(settings, "DATABASE_REPLICAS", ()))
+
+
+@contextmanager
+def use_primary():
+    """Чтение внутри блока идёт в основную базу."""
+    depth = getattr(_local, "primary", 0)
+    _local.primary = depth + 1
+    try:
+        yield
+    finally:
+        _local.primary = depth
+
+
+@contextmanager
+def scope(sticky=False):
+    """Запрос или фоновая задача: запись закрепляет чтение до конца блока.
+
+    Отдаёт состояние потока; ``wrote`` в нём показывает, была ли запись.
+    """
+    _local.sticky = sticky
+    _local.wrote = False
+    try:
+        yield _local
+    finally:
+        _local.sticky = _local.wrote = False
+
+
+def pinned():
+    """Должно ли чтение в текущем потоке идти в основную базу."""
+    return bool(getattr(_local, "primary", 0)
+                or getattr(_local, "sticky", False)
+                or getattr(_local, "wrote", False)
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if (not aliases or model._meta.app_label not in REPLICATED_APPS
+                or pinned()):
+            return DEFAULT_DB_ALIAS
+        # Связанные объекты читаем с той же реплики, что и сам объект.
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db in aliases:
+            return instance._state.db
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        _local.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На всех базах одни и те же данные.
+        return True
+
+
+class PrimaryStickyMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            until = float(request.COOKIES.get(STICKY_COOKIE, 0))
+        except ValueError:
+            until = 0
+        with scope(sticky=until > time.time()) as state:
+            response = self.get_response(request)
+            wrote = state.wrote
+        if wrote:
+            response.set_cookie(
+                STICKY_COOKIE, str(int(time.time()) + PRIMARY_STICKY_SECONDS),
+                max_age=PRIMARY_STICKY_SECONDS, httponly=True,
+                samesite="Lax")
+        return response
@@ -0,0 +1,98 @@
+"""Полнотекстовый поиск по постам.
+
+На SQLite запрос идёт в индекс FTS5 ``posts_post_fts`` и результаты
+упорядочены по bm25. На других СУБД поиск откатывается к ``icontains``.
+
+Индекс обновляют триггеры на ``posts_post``. SQLite теряет их, когда
+миграция пересоздаёт таблицу, поэтому после каждого ``migrate``
+``restore_triggers`` создаёт недостающие и перестраивает индекс.
+"""
+from django.db import connection, connections
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Post, PostSearchIndex
+
+SEARCH_ORDERING = ("rank", "id")
+
+FTS_TRIGGERS = {
+    "posts_post_fts_insert": """
+        CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post
+        BEGIN
+            INSERT INTO posts_post_fts(rowid, text)
+            VALUES (new.id, new.text);
+        END
+    """,
+    "posts_post_fts_delete": """
+        CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post
+        BEGIN
+            INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END
+    """,
+    "posts_post_fts_update": """
+        CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text
+        ON posts_post BEGIN
+            INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO posts_post_fts(rowid, text)
+            VALUES (new.id, new.text);
+        END
+    """,
+}
+
+
+def fts_query(text):
+    """Превращает пользовательский ввод в запрос FTS5 из фраз через AND.
+
+    Кавычки экранируются, поэтому синтаксис FTS5 во вводе не работает
+    и не может сломать запрос.
+    """
+    terms = text.split()
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def uses_index():
+    return connection.vendor == "sqlite"
+
+
+def restore_triggers(using="default", **kwargs):
+    """Обработчик post_migrate: возвращает потерянные триггеры индекса.
+
+    Посты, изменённые без триггеров, могли выпасть из индекса, поэтому
+    он перестраивается. Возвращает имена созданных триггеров.
+    """
+    db = connections[using]
+    if db.vendor != "sqlite":
+        return []
+    with db.cursor() as cursor:
+        cursor.execute("SELECT type, name FROM sqlite_master "
+                       "WHERE name LIKE 'posts_post_fts%'")
+        existing = {name for _, name in cursor.fetchall()}
+        # Миграция индекса ещё не применена (или откачена).
+        if "posts_post_fts" not in existing:
+            return []
+        missing = [name for name in FTS_TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(FTS_TRIGGERS[name])
+        if missing:
+            cursor.execute("INSERT INTO posts_post_fts(posts_post_fts) "
+                           "VALUES ('rebuild')")
+    return missing
+
+
+def search_posts(text, queryset=None):
+    """Посты по запросу с аннотацией ``rank`` (меньше — лучше)."""
+    if queryset is None:
+        queryset = Post.objects.all()
+    query = fts_query(text)
+    if not query:
+        return queryset.none()
+    if not uses_index():
+        return queryset.filter(text__icontains=text).annotate(
+            rank=Value(0.0, output_field=FloatField())
+        )
+    table = PostSearchIndex._meta.db_table
+    return queryset.filter(search_index__text__match=query).annotate(
+        rank=RawSQL(f'bm25("{table}")', (), output_field=FloatField())
+    )
@@ -0,0 +1,227 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import counts, media, page_cache, stats, timeline
+from .models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.bulk_create([AuthorStats(user=instance)],
+                                        ignore_conflicts=True)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.change(instance.author_id, "posts_count", 1)
+
+
+@receiver(post_save, sender=Post)
+def count_new_feed_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counts.post_added(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_regrouped_post(sender, instance, created, raw=False, **kwargs):
+    # Прежнюю группу запоминает remember_previous_post.
+    if not created and not raw and "_previous_group_id" in instance.__dict__:
+        counts.regroup(instance.__dict__.pop("_previous_group_id"),
+                       instance.group_id)
+
+
+@receiver(post_save, sender=Post)
+def bump_edited_post(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        instance.bump_version()
+
+
+@receiver(post_save, sender=Comment)
+def bump_commented_post(sender, instance, created, raw=False, **kwargs):
+    # Правка комментария (например, в админке) тоже меняет страницу поста.
+    if not raw:
+        instance.post.bump_version()
+
+
+@receiver(post_delete, sender=Comment)
+def bump_uncommented_post(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id).update(
+        version=F("version") + 1, updated=timezone.now())
+
+
+@receiver(post_save, sender=Group)
+def bump_group_posts(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        instance.posts.update(version=F("version") + 1, updated=timezone.now())
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, raw=False, update_fields=None,
+                      **kwargs):
+    if (instance.pk and not raw
+            and (update_fields is None or "username" in update_fields)):
+        instance._previous_username = User.objects.filter(
+            pk=instance.pk).values_list("username", flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def bump_renamed_author_posts(sender, instance, created, raw=False,
+                              **kwargs):
+    # Имя автора есть в карточках и на страницах лент.
+    previous = instance.__dict__.pop("_previous_username", None)
+    if created or raw or previous in (None, instance.username):
+        return
+    instance.posts.update(version=F("version") + 1, updated=timezone.now())
+    groups = Group.objects.filter(posts__author=instance).values_list(
+        "slug", flat=True).distinct()
+    page_cache.invalidate(page_cache.index_scope(),
+                          page_cache.profile_scope(previous),
+                          page_cache.profile_scope(instance.username),
+                          *map(page_cache.group_scope, groups))
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    stats.change(instance.author_id, "posts_count", -1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_feed_post(sender, instance, **kwargs):
+    counts.post_added(instance, -1)
+
+
+@receiver(post_delete, sender=Group)
+def forget_deleted_group(sender, instance, **kwargs):
+    counts.forget(counts.GROUP, [instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+def forget_deleted_image(sender, instance, **kwargs):
+    if instance.image:
+        media.forget(instance.image.name)
+
+
+def _group_scopes(group):
+    """Страницы с постами группы: её лента, главная и профили авторов."""
+    authors = User.objects.filter(posts__group=group).values_list(
+        "username", flat=True).distinct()
+    return [page_cache.index_scope(), page_cache.group_scope(group.slug),
+            *map(page_cache.profile_scope, authors)]
+
+
+# Кэш страниц сбрасывается здесь, а не в представлениях, чтобы новые посты,
+# правки и удаления из админки и shell тоже были видны (импорт обходит
+# сигналы и сбрасывает кэш сам). Прежние области (группа до переноса поста,
+# старый адрес группы) запоминаются до сохранения.
+
+@receiver(pre_save, sender=Post)
+def remember_previous_post(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        previous = Post.objects.select_related("author", "group").filter(
+            pk=instance.pk).first()
+        if previous is not None:
+            instance._previous_group_id = previous.group_id
+            instance._page_scopes = page_cache.post_scopes(previous)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        page_cache.invalidate(*instance.__dict__.pop("_page_scopes", []),
+                              *page_cache.post_scopes(instance))
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post(sender, instance, **kwargs):
+    page_cache.invalidate_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def invalidate_commented_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        page_cache.invalidate_post(instance.post)
+
+
+@receiver(post_delete, sender=Comment)
+def invalidate_uncommented_post(sender, instance, **kwargs):
+    post = Post.objects.select_related("author", "group").filter(
+        pk=instance.post_id).first()
+    if post is not None:
+        page_cache.invalidate_post(post)
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_scopes(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        previous = Group.objects.filter(pk=instance.pk).first()
+        instance._page_scopes = _group_scopes(previous) if previous else []
+
+
+@receiver(post_save, sender=Group)
+def invalidate_saved_group(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        page_cache.invalidate(*instance.__dict__.pop("_page_scopes", []),
+                              page_cache.group_scope(instance.slug))
+
+
+@receiver(pre_delete, sender=Group)
+def remember_deleted_group_scopes(sender, instance, **kwargs):
+    instance._page_scopes = _group_scopes(instance)
+
+
+@receiver(post_delete, sender=Group)
+def invalidate_deleted_group(sender, instance, **kwargs):
+    page_cache.invalidate(*instance.__dict__.pop("_page_scopes", []))
+
+
+@receiver(post_save, sender=Follow)
+def invalidate_followed_profile(sender, instance, created, raw=False,
+                                **kwargs):
+    if created and not raw:
+        page_cache.invalidate(
+            page_cache.profile_scope(instance.author.username))
+
+
+@receiver(post_delete, sender=Follow)
+def invalidate_unfollowed_profile(sender, instance, **kwargs):
+    page_cache.invalidate(page_cache.profile_scope(instance.author.username))
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        added = timeline.backfill(instance.user_id, instance.author_id)
+        counts.change(counts.FOLLOW, [instance.user_id], added)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    removed = timeline.prune(instance.user_id, instance.author_id)
+    counts.change(counts.FOLLOW, [instance.user_id], -removed)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.change(instance.author_id, "followers_count", 1)
+        stats.change(instance.user_id, "following_count", 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    stats.change(instance.author_id, "followers_count", -1)
+    stats.change(instance.user_id, "following_count", -1)
@@ -0,0 +1,91 @@
+"""Денормализованные счётчики авторов.
+
+Счётчики меняются атомарным ``UPDATE ... SET x = x + 1`` из сигналов,
+а строка создаётся по требованию пересчётом из исходных таблиц.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Follow, Post
+
+BATCH_SIZE = 1000
+COUNTER_FIELDS = ("posts_count", "followers_count", "following_count")
+
+
+def _count(queryset, field):
+    counts = queryset.filter(
+        **{field: OuterRef("pk")}
+    ).order_by().values(field).annotate(count=Count("pk")).values("count")
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def with_actual_counts(users):
+    """Пользователи с настоящими значениями счётчиков из исходных таблиц."""
+    return users.annotate(
+        actual_posts_count=_count(Post.objects.all(), "author"),
+        actual_followers_count=_count(Follow.objects.all(), "author"),
+        actual_following_count=_count(Follow.objects.all(), "user"),
+    )
+
+
+def compute(user):
+    return AuthorStats(
+        user=user,
+        posts_count=user.posts.count(),
+        followers_count=user.following.count(),
+        following_count=user.follower.count(),
+    )
+
+
+def get_stats(user):
+    """Счётчики автора; без строки считает их и сохраняет."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        pass
+    stats = compute(user)
+    try:
+        with transaction.atomic():
+            stats.save(force_insert=True)
+    except IntegrityError:
+        stats = AuthorStats.objects.get(pk=user.pk)
+    return stats
+
+
+def change(user_id, field, delta):
+    stats = AuthorStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        stats = stats.filter(**{f"{field}__gte": -delta})
+    updated = stats.update(**{field: F(field) + delta})
+    # Отсутствующая строка будет посчитана целиком при первом чтении.
+    return bool(updated)
+
+
+def reconcile(users, batch_size=BATCH_SIZE):
+    """Исправляет расхождения счётчиков; возвращает число исправлений."""
+    fixed = 0
+    last_pk = 0
+    users = with_actual_counts(users.order_by("pk"))
+    while True:
+        batch = list(users.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return fixed
+        last_pk = batch[-1].pk
+        existing = AuthorStats.objects.in_bulk([user.pk for user in batch])
+        to_create, to_update = [], []
+        for user in batch:
+            actual = {field: getattr(user, f"actual_{field}")
+                      for field in COUNTER_FIELDS}
+            stats = existing.get(user.pk)
+            if stats is None:
+                to_create.append(AuthorStats(user_id=user.pk, **actual))
+            elif any(getattr(stats, field) != value
+                     for field, value in actual.items()):
+                for field, value in actual.items():
+                    setattr(stats, field, value)
+                to_update.append(stats)
+        with transaction.atomic():
+            AuthorStats.objects.bulk_create(to_create, ignore_conflicts=True)
+            AuthorStats.objects.bulk_update(to_update, COUNTER_FIELDS)
+        fixed += len(to_create) + len(to_update)
@@ -0,0 +1,20 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def querystring(context, **kwargs):
+    """Строка запроса текущей страницы с заменёнными параметрами.
+
+    Параметр со значением ``None`` убирается.
+
+        <a href="?{% querystring cursor=page.next_cursor page=None %}">
+    """
+    params = context["request"].GET.copy()
+    for key, value in kwargs.items():
+        if value is None:
+            params.pop(key, None)
+        else:
+            params[key] = value
+    return params.urlencode()
@@ -0,0 +1,33 @@
+from django import template
+
+from .. import cards
+
+register = template.Library()
+
+
+class PostCardNode(template.Node):
+    def __init__(self, post, nodelist):
+        self.post = post
+        self.nodelist = nodelist
+
+    def render(self, context):
+        post = self.post.resolve(context)
+        return cards.get_or_render(post, lambda: self.nodelist.render(context))
+
+
+@register.tag
+def postcard(parser, token):
+    """Кэширует содержимое блока по версии поста.
+
+    Внутри блока не должно быть ничего, что зависит от зрителя.
+
+        {% postcard post %}...{% endpostcard %}
+    """
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' принимает ровно один аргумент — пост"
+        )
+    nodelist = parser.parse(("endpostcard",))
+    parser.delete_first_token()
+    return PostCardNode(parser.compile_filter(bits[1]), nodelist)
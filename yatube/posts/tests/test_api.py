@@ -0,0 +1,124 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Mobile')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.group = Group.objects.create(title='Group', slug='group',
+                                         description='Test')
+        for i in range(12):
+            Post.objects.create(text=f'Test_text{i}', author=cls.author,
+                                group=cls.group)
+        cls.post = Post.objects.latest('pub_date')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_feeds_return_posts_with_cursor(self):
+        group_url = reverse('posts:api_group',
+                            kwargs={'slug': self.group.slug})
+        profile_url = reverse('posts:api_profile',
+                              kwargs={'username': self.author.username})
+        urls = {
+            reverse('posts:api_index'): self.guest_client,
+            group_url: self.guest_client,
+            profile_url: self.guest_client,
+            reverse('posts:api_follow_index'): self.authorized_client,
+        }
+        for url, client in urls.items():
+            with self.subTest(url=url):
+                data = client.get(url).json()
+                self.assertEqual(len(data['results']), 10)
+                self.assertEqual(data['results'][0]['text'], 'Test_text11')
+                self.assertEqual(data['results'][0]['author'], 'Writer')
+                self.assertEqual(data['results'][0]['group'], 'group')
+                rest = client.get(url, {'cursor': data['next']}).json()
+                self.assertEqual(len(rest['results']), 2)
+                self.assertIsNone(rest['next'])
+
+    def test_follow_feed_requires_login(self):
+        response = self.guest_client.get(reverse('posts:api_follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_unchanged_poll_is_not_modified(self):
+        """Повторный опрос с ETag получает 304 без выборки постов."""
+        url = reverse('posts:api_index')
+        response = self.guest_client.get(url)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_validators_change_with_posts_and_comments(self):
+        """Новый пост, правка и комментарий меняют ETag."""
+        def edit():
+            post = Post.objects.get(pk=self.post.pk)
+            post.text = 'Edit'
+            post.save()
+
+        url = reverse('posts:api_index')
+        etag = self.guest_client.get(url)['ETag']
+        changes = [
+            lambda: Post.objects.create(text='New', author=self.author),
+            edit,
+            lambda: Comment.objects.create(post=self.post, author=self.user,
+                                           text='Hi'),
+            lambda: Comment.objects.filter(post=self.post).delete(),
+        ]
+        for change in changes:
+            change()
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            etag = response['ETag']
+
+    def test_version_bump_keeps_updated_precise(self):
+        """Сдвиг версии ставит updated не раньше момента изменения."""
+        changed = timezone.now()
+        Comment.objects.create(post=self.post, author=self.user, text='Hi')
+        self.assertGreaterEqual(
+            Post.objects.get(pk=self.post.pk).updated, changed)
+        changed = timezone.now()
+        self.post.bump_version()
+        self.assertGreaterEqual(
+            Post.objects.get(pk=self.post.pk).updated, changed)
+
+    def test_post_detail_and_comments(self):
+        comment = Comment.objects.create(post=self.post, author=self.user,
+                                         text='Hi')
+        detail = self.guest_client.get(
+            reverse('posts:api_post', kwargs={'post_id': self.post.id}))
+        self.assertEqual(detail.json()['comments'], 1)
+        self.assertTrue(detail.has_header('Last-Modified'))
+        url = reverse('posts:api_comments', kwargs={'post_id': self.post.id})
+        response = self.guest_client.get(url)
+        self.assertEqual(response.json()['results'][0]['author'], 'Mobile')
+        etag = response['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        comment.text = 'Правка модератора'
+        comment.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['text'],
+                         'Правка модератора')
+
+    def test_missing_post_is_404(self):
+        response = self.guest_client.get(
+            reverse('posts:api_post', kwargs={'post_id': 10 ** 6}))
+        self.assertEqual(response.status_code, 404)
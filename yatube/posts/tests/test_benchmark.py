@@ -0,0 +1,64 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+
+from .. import urls
+from ..benchmarks import dataset
+from ..benchmarks.runner import Runner, compare
+from ..models import Follow, Post, TimelineEntry
+
+
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        dataset.generate(dataset.DatasetSize(
+            users=20, groups=3, posts=100, comments=100, follows_per_user=5))
+
+    def test_dataset_fills_timelines(self):
+        """После генерации ленты подписок совпадают с подписками."""
+        expected = sum(Post.objects.filter(author_id=author_id).count()
+                       for author_id in Follow.objects.values_list(
+                           'author_id', flat=True))
+        self.assertEqual(TimelineEntry.objects.count(), expected)
+
+    def test_runner_covers_views_without_errors(self):
+        """Прогон обходит страницы лент без ошибок сервера."""
+        names = ('posts:index', 'posts:group', 'posts:profile',
+                 'posts:post', 'posts:follow_index', 'posts:new_post')
+        results = Runner().run(iterations=2, warmup=1, names=names)
+        self.assertEqual(set(results), set(names))
+        for name, summary in results.items():
+            self.assertEqual(summary['errors'], 0, name)
+            self.assertEqual(summary['requests'], 2, name)
+
+    def test_scenarios_cover_every_url(self):
+        """Каждое имя из posts.urls замеряется и отвечает без ошибок."""
+        runner = Runner()
+        names = {f'{urls.app_name}:{pattern.name}'
+                 for pattern in urls.urlpatterns}
+        self.assertEqual({name for name, _ in runner.scenarios()}, names)
+        results = runner.run(iterations=1, warmup=0)
+        for name, summary in results.items():
+            self.assertEqual(summary['errors'], 0, name)
+
+    def test_compare_reports_query_growth(self):
+        baseline = {'posts:index': {'p50_ms': 1.0, 'p99_ms': 2.0,
+                                    'queries': 3}}
+        current = {'posts:index': {'p50_ms': 1.0, 'p99_ms': 2.0,
+                                   'queries': 4}}
+        self.assertEqual(len(compare(current, baseline)), 1)
+        self.assertEqual(compare(baseline, baseline), [])
+
+    def test_existing_database_file_is_not_overwritten(self):
+        handle, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        with mock.patch.dict(connection.settings_dict['TEST']), \
+                self.assertRaisesMessage(CommandError, '--keepdb'):
+            call_command('benchmark', '--database-file', path)
+        self.assertEqual(os.path.getsize(path), 0)
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import cards
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Writer')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.post = Post.objects.create(text='first', author=cls.author)
+        cls.post_url = reverse('posts:post',
+                               kwargs={'username': cls.author.username,
+                                       'post_id': cls.post.id})
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_second_render_hits_cache(self):
+        hits = cards.counters['hits']
+        self.reader_client.get(self.post_url)
+        self.reader_client.get(self.post_url)
+        self.assertEqual(cards.counters['hits'], hits + 1)
+
+    def test_edit_bumps_version(self):
+        self.reader_client.get(self.post_url)
+        self.author_client.post(
+            reverse('posts:edit', kwargs={'username': self.author.username,
+                                          'post_id': self.post.id}),
+            data={'text': 'edited'}
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 2)
+        response = self.reader_client.get(self.post_url)
+        self.assertContains(response, 'edited')
+
+    def test_edit_keeps_concurrent_bumps(self):
+        """Сохранение не откатывает версию, поднятую в другом месте."""
+        post = Post.objects.get(pk=self.post.pk)
+        self.post.bump_version()
+        post.text = 'edited'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.version, 3)
+        self.assertEqual(post.text, 'edited')
+
+    def test_comment_bumps_version(self):
+        Comment.objects.create(post=self.post, author=self.reader, text='c')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 2)
+
+    def test_author_rename_bumps_version(self):
+        """Карточка показывает имя автора: переименование её обновляет."""
+        url = reverse('posts:index')
+        self.reader_client.get(url)
+        author = User.objects.get(pk=self.author.pk)
+        author.username = 'Renamed'
+        author.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 2)
+        self.assertContains(self.reader_client.get(url), '@Renamed')
+        author.last_name = 'Писатель'
+        author.save(update_fields=['last_name'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 2)
+
+    def test_edit_button_is_not_cached(self):
+        """Кнопка редактирования видна только автору даже из кэша."""
+        response = self.author_client.get(self.post_url)
+        self.assertContains(response, 'Редактировать')
+        response = self.reader_client.get(self.post_url)
+        self.assertNotContains(response, 'Редактировать')
@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..paginator import COMMENTS_PER_PAGE
+
+User = get_user_model()
+
+
+class CommentChunksTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Talker')
+        cls.post = Post.objects.create(text='Test_text', author=cls.user)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Comment {i}')
+            for i in range(COMMENTS_PER_PAGE * 2 + 5))
+        cls.kwargs = {'username': cls.user.username, 'post_id': cls.post.id}
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_post_page_renders_first_chunk(self):
+        response = self.guest_client.get(reverse('posts:post',
+                                                 kwargs=self.kwargs))
+        comments = list(response.context['comments'])
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text, 'Comment 0')
+        self.assertIsNotNone(response.context['comments_next_url'])
+
+    def test_fragments_walk_all_comments(self):
+        """Фрагменты по очереди отдают все комментарии без повторов."""
+        response = self.guest_client.get(reverse('posts:post',
+                                                 kwargs=self.kwargs))
+        seen = [item.text for item in response.context['comments']]
+        next_url = response.context['comments_next_url']
+        while next_url:
+            response = self.guest_client.get(next_url)
+            self.assertTemplateUsed(response, 'includes/comment_list.html')
+            self.assertTemplateNotUsed(response, 'base.html')
+            seen.extend(item.text for item in response.context['comments'])
+            next_url = response.context['comments_next_url']
+        self.assertEqual(seen, [f'Comment {i}'
+                                for i in range(COMMENTS_PER_PAGE * 2 + 5)])
+
+    def test_fragment_is_two_queries(self):
+        """Фрагмент: проверка поста и одна порция комментариев."""
+        url = reverse('posts:comments', kwargs=self.kwargs)
+        with self.assertNumQueries(2):
+            self.guest_client.get(url)
+
+    def test_fragment_of_missing_post_is_404(self):
+        response = self.guest_client.get(reverse(
+            'posts:comments',
+            kwargs={'username': 'nobody', 'post_id': self.post.id}))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from ..models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+class ConditionalPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Writer')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.post = Post.objects.create(text='Test_text', author=cls.author)
+        cls.post_url = reverse('posts:post',
+                               kwargs={'username': cls.author.username,
+                                       'post_id': cls.post.id})
+        cls.profile_url = reverse('posts:profile',
+                                  kwargs={'username': cls.author.username})
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def assertNotModified(self, client, url, etag):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def assertModified(self, client, url, etag):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_unchanged_pages_are_not_modified(self):
+        urls = [reverse('posts:index'), self.profile_url, self.post_url,
+                reverse('posts:index') + '?page=1']
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertFalse(response.has_header('Last-Modified'))
+                self.assertNotModified(self.guest_client, url,
+                                       response['ETag'])
+
+    def test_not_modified_skips_rendering(self):
+        """304 обходится запросом валидатора, без шаблонов."""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.templates, [])
+
+    def test_new_and_edited_posts_change_feed(self):
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        Post.objects.create(text='New', author=self.author)
+        etag = self.assertModified(self.guest_client, url, etag)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Edited'
+        post.save()
+        self.assertModified(self.guest_client, url, etag)
+
+    def test_deleted_post_is_not_hidden_by_modified_since(self):
+        """Удаление не двигает updated ленты: решает только ETag."""
+        url = reverse('posts:index')
+        post = Post.objects.create(text='Gone', author=self.author)
+        since = Post.objects.get(pk=post.pk).updated
+        post.delete()
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(since.timestamp() + 60))
+        self.assertEqual(response.status_code, 200)
+
+    def test_comments_change_post_page(self):
+        etag = self.guest_client.get(self.post_url)['ETag']
+        comment = Comment.objects.create(post=self.post, author=self.reader,
+                                         text='Hi')
+        etag = self.assertModified(self.guest_client, self.post_url, etag)
+        comment.delete()
+        self.assertModified(self.guest_client, self.post_url, etag)
+
+    def test_follow_changes_profile(self):
+        """Подписка меняет и кнопку, и счётчик подписчиков."""
+        etag = self.reader_client.get(self.profile_url)['ETag']
+        guest_etag = self.guest_client.get(self.profile_url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertModified(self.reader_client, self.profile_url, etag)
+        self.assertModified(self.guest_client, self.profile_url, guest_etag)
+
+    def test_validators_depend_on_reader(self):
+        """Чужая ETag не подходит: разметка зависит от читателя."""
+        etag = self.guest_client.get(reverse('posts:index'))['ETag']
+        self.assertModified(self.reader_client, reverse('posts:index'), etag)
@@ -0,0 +1,107 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import counts
+from ..models import FeedCount, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedCountsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.other_group = Group.objects.create(title='Другая', slug='other',
+                                               description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(3):
+            Post.objects.create(text=f'Пост {i}', author=cls.author,
+                                group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def feeds(self):
+        return (counts.get(counts.INDEX),
+                counts.get(counts.GROUP, self.group.pk),
+                counts.get(counts.FOLLOW, self.reader.pk))
+
+    def test_counters_follow_new_and_deleted_posts(self):
+        self.assertEqual(self.feeds(), (3, 3, 3))
+        post = Post.objects.create(text='Новый', author=self.author,
+                                   group=self.group)
+        self.assertEqual(self.feeds(), (4, 4, 4))
+        post.delete()
+        self.assertEqual(self.feeds(), (3, 3, 3))
+
+    def test_counters_follow_regrouping_and_follows(self):
+        self.feeds()
+        counts.get(counts.GROUP, self.other_group.pk)
+        post = Post.objects.first()
+        self.client.post(
+            reverse('posts:edit', args=[self.author.username, post.id]),
+            {'text': 'Правка', 'group': self.other_group.pk})
+        self.assertEqual(counts.get(counts.GROUP, self.group.pk), 2)
+        self.assertEqual(counts.get(counts.GROUP, self.other_group.pk), 1)
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(counts.get(counts.FOLLOW, self.reader.pk), 0)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(counts.get(counts.FOLLOW, self.reader.pk), 3)
+
+    def test_counters_follow_regrouping_outside_views(self):
+        """Перенос поста в админке или shell тоже меняет счётчики групп."""
+        counts.get(counts.GROUP, self.group.pk)
+        counts.get(counts.GROUP, self.other_group.pk)
+        post = Post.objects.first()
+        post.group = self.other_group
+        post.save()
+        post.group = None
+        post.save()
+        self.assertEqual(counts.get(counts.GROUP, self.group.pk), 2)
+        self.assertEqual(counts.get(counts.GROUP, self.other_group.pk), 0)
+
+    def test_reconcile_repairs_drift(self):
+        """Пост, пропущенный при создании строки, возвращается сверкой."""
+        self.feeds()
+        FeedCount.objects.filter(kind=counts.GROUP).update(count=2)
+        FeedCount.objects.filter(kind=counts.FOLLOW).update(count=9)
+        out = StringIO()
+        call_command('reconcile_feed_counts', batch_size=1, stdout=out)
+        self.assertIn('Исправлено счётчиков: 2', out.getvalue())
+        self.assertEqual(self.feeds(), (3, 3, 3))
+
+    def test_numbered_pages_read_the_counter(self):
+        """Навигация по номерам не считает посты ленты."""
+        Post.objects.bulk_create(Post(text=f'Ещё {i}', author=self.author)
+                                 for i in range(60))
+        counts.forget(counts.INDEX)
+        counts.get(counts.INDEX)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index') + '?page=2')
+        self.assertFalse(any('COUNT(*)' in query['sql'] for query in queries))
+        self.assertEqual(response.context['page'].navigation,
+                         [1, 2, 3, 4, None, 7])
+
+    def test_estimated_feeds_are_not_maintained(self):
+        with mock.patch.object(counts, 'FEED_COUNTS_ESTIMATED',
+                               (counts.INDEX,)):
+            Post.objects.create(text='Новый', author=self.author)
+            with self.assertNumQueries(1):
+                estimate = counts.get(counts.INDEX)
+        self.assertEqual(estimate, Post.objects.latest('id').id)
+        self.assertFalse(
+            FeedCount.objects.filter(kind=counts.INDEX).exists())
@@ -0,0 +1,107 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportContentTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.group = Group.objects.create(title='Group', slug='group',
+                                         description='Test')
+        cls.post = Post.objects.create(text='Test_text', author=cls.author,
+                                       group=cls.group)
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Hi')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def export(self, *args):
+        call_command('export_content', self.directory, *args,
+                     stdout=StringIO(), stderr=StringIO())
+
+    def read(self, name):
+        path = os.path.join(self.directory, f'{name}.jsonl.gz')
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def test_every_model_is_exported(self):
+        self.export()
+        post, = self.read('post')
+        self.assertEqual(post['author'], 'Writer')
+        self.assertEqual(post['group'], 'group')
+        self.assertEqual(post['pub_date'], self.post.pub_date.isoformat())
+        self.assertEqual(self.read('comment')[0]['post'], self.post.id)
+        self.assertEqual(self.read('follow')[0]['user'], 'Reader')
+        self.assertEqual(self.read('group')[0]['slug'], 'group')
+
+    def test_incremental_export_takes_new_and_edited_rows(self):
+        """Выгрузка от манифеста берёт только новое и изменённое."""
+        self.export()
+        manifest = os.path.join(self.directory, 'manifest.json')
+        previous = os.path.join(tempfile.mkdtemp(), 'manifest.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(previous))
+        shutil.copy(manifest, previous)
+        new_post = Post.objects.create(text='New', author=self.author)
+        edited = Post.objects.get(pk=self.post.pk)
+        edited.text = 'Edited'
+        edited.save()
+        other = User.objects.create_user(username='Other')
+        Follow.objects.create(user=other, author=self.author)
+        self.export('--incremental', previous)
+        self.assertEqual([row['id'] for row in self.read('post')],
+                         [self.post.id, new_post.id])
+        self.assertEqual(self.read('comment'), [])
+        self.assertEqual([row['user'] for row in self.read('follow')],
+                         ['Other'])
+        self.assertEqual(self.read('group'), [])
+
+    def test_export_can_be_imported_back(self):
+        self.export()
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        for name in ('group', 'post', 'comment'):
+            call_command('import_content',
+                         os.path.join(self.directory, f'{name}.jsonl.gz'),
+                         stdout=StringIO(), stderr=StringIO())
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.text, 'Test_text')
+        self.assertEqual(post.pub_date, self.post.pub_date)
+        self.assertEqual(post.group.slug, 'group')
+        self.assertEqual(post.comments.get().text, 'Hi')
+
+    def test_incremental_export_can_be_imported_again(self):
+        """Правленый пост из инкрементальной выгрузки обновляет прежний."""
+        self.export()
+        previous = os.path.join(tempfile.mkdtemp(), 'manifest.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(previous))
+        shutil.copy(os.path.join(self.directory, 'manifest.json'), previous)
+        edited = Post.objects.get(pk=self.post.pk)
+        edited.text = 'Edited'
+        edited.save()
+        self.export('--incremental', previous)
+        Post.objects.filter(pk=self.post.pk).update(text='Test_text')
+        out = StringIO()
+        call_command('import_content',
+                     os.path.join(self.directory, 'post.jsonl.gz'),
+                     stdout=out, stderr=StringIO())
+        self.assertIn('обновлено постов 1', out.getvalue())
+        self.assertEqual(Post.objects.get(pk=self.post.pk).text, 'Edited')
+        self.assertEqual(Post.objects.count(), 1)
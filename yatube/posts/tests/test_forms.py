@@ -161,3 +161,20 @@ class PostCreateFormTests(TestCase):
                 text=self.post.text,
             ).exists()
         )
+
+    def test_not_author_cant_edit_post(self):
+        """Чужой пост не меняется, а правка ведёт на страницу поста"""
+        other_client = Client()
+        other_client.force_login(User.objects.create_user(username='Other'))
+        url = reverse('posts:post', kwargs={'username': self.user.username,
+                                            'post_id': self.post.id})
+        response = other_client.post(
+            reverse('posts:edit', kwargs={'username': self.user.username,
+                                          'post_id': self.post.id}),
+            data={'text': 'Чужая правка', 'group': self.group2.id},
+        )
+        self.assertRedirects(response, url)
+        post = Post.objects.get(id=self.post.id)
+        self.assertEqual(post.text, self.post.text)
+        self.assertEqual(post.author, self.user)
+        self.assertEqual(post.group, self.group)
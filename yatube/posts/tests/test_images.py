@@ -0,0 +1,80 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from .. import images, metrics
+from ..forms import PostForm
+from ..models import Post
+
+User = get_user_model()
+
+
+def camera_jpeg(size=(3000, 2000)):
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: повернуть на 90° по часовой.
+    exif[0x010F] = 'Camera'
+    buffer = BytesIO()
+    Image.effect_noise(size, 64).convert('RGB').save(
+        buffer, 'JPEG', quality=95, exif=exif.tobytes())
+    return SimpleUploadedFile('photo.jpg', buffer.getvalue(),
+                              content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+class ImageIngestTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Writer')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def stored_bytes(self):
+        registry = metrics._process.get()
+        return {stage: registry.values.get(
+            ('yatube_image_bytes_total', (stage,)), 0)
+            for stage in ('original', 'stored')}
+
+    def test_camera_upload_is_downscaled_and_stripped(self):
+        upload = camera_jpeg()
+        before = self.stored_bytes()
+        post = Post.objects.create(text='Photo', author=self.user,
+                                   image=upload)
+        self.assertTrue(post.image.name.endswith('photo.webp'))
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.format, 'WEBP')
+            self.assertEqual(stored.size, (1365, images.IMAGE_MAX_SIDE))
+            self.assertEqual(dict(stored.getexif()), {})
+        after = self.stored_bytes()
+        self.assertEqual(after['original'] - before['original'], upload.size)
+        self.assertEqual(after['stored'] - before['stored'],
+                         post.image.size)
+        self.assertLess(post.image.size, upload.size)
+
+    def test_small_web_image_is_kept(self):
+        """Перекодирование не должно раздувать и так маленькую картинку."""
+        buffer = BytesIO()
+        Image.new('P', (2, 2)).save(buffer, 'GIF')
+        upload = SimpleUploadedFile('small.gif', buffer.getvalue(),
+                                    content_type='image/gif')
+        post = Post.objects.create(text='Gif', author=self.user,
+                                   image=upload)
+        self.assertTrue(post.image.name.endswith('small.gif'))
+        self.assertEqual(post.image.size, upload.size)
+
+    @mock.patch.object(images, 'IMAGE_MAX_PIXELS', 100)
+    def test_form_rejects_too_many_pixels(self):
+        form = PostForm(data={'text': 'Big'},
+                        files={'image': camera_jpeg((20, 20))})
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
@@ -0,0 +1,180 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import importing
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+SMALL_GIF = (b'\x47\x49\x46\x38\x39\x61\x02\x00'
+             b'\x01\x00\x80\x00\x00\x00\x00\x00'
+             b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+             b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+             b'\x0A\x00\x3B')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+class ImportContentTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.group = Group.objects.create(title='Group', slug='group',
+                                         description='Test')
+        cls.tmp = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+        super().tearDownClass()
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def run_import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_content', path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_jsonl_import_in_batches(self):
+        """Посты, комментарии и подписки импортируются пачками."""
+        records = [{'type': 'follow', 'user': 'Reader', 'author': 'Writer'}]
+        records += [{'type': 'post', 'id': 1000 + i, 'author': 'Writer',
+                     'group': 'group', 'text': f'Imported {i}',
+                     'pub_date': f'2020-01-0{i + 1}T12:00:00'}
+                    for i in range(5)]
+        records += [{'type': 'comment', 'post': 1000 + i % 5,
+                     'author': 'Reader', 'text': 'Hi'} for i in range(7)]
+        path = self.write('data.jsonl', '\n'.join(map(json.dumps, records)))
+        out, err = self.run_import(path, '--batch-size', '2')
+        self.assertIn('постов 5, комментариев 7, подписок 1', out)
+        self.assertEqual(err, '')
+        post = Post.objects.get(pk=1000)
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.comments.count(), 2)
+        self.assertEqual(TimelineEntry.objects.filter(
+            user=self.reader).count(), 5)
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 5)
+        self.assertEqual(self.author.stats.followers_count, 1)
+
+    def test_csv_import_skips_bad_rows(self):
+        path = self.write('posts.csv', 'author,text,group\n'
+                                       'Writer,First,\n'
+                                       'Nobody,Lost,\n'
+                                       'Writer,Second,missing\n')
+        out, err = self.run_import(path, '--type', 'post')
+        self.assertIn('постов 1', out)
+        self.assertIn('пропущено 2', out)
+        self.assertIn('строка 3: нет пользователя Nobody', err)
+        self.assertTrue(Post.objects.filter(text='First').exists())
+
+    def test_create_missing_authors_and_groups(self):
+        path = self.write('new.jsonl', json.dumps(
+            {'type': 'post', 'author': 'Newcomer', 'group': 'fresh',
+             'text': 'Hello'}))
+        self.run_import(path, '--create-missing')
+        post = Post.objects.get(text='Hello')
+        self.assertEqual(post.author.username, 'Newcomer')
+        self.assertEqual(post.group.slug, 'fresh')
+
+    def test_comments_to_missing_posts_are_skipped(self):
+        path = self.write('comments.jsonl', json.dumps(
+            {'type': 'comment', 'post': 10 ** 6, 'author': 'Reader',
+             'text': 'Hi'}) + '\nnot json\n')
+        out, err = self.run_import(path)
+        self.assertIn('пропущено 2', out)
+        self.assertIn('строка 2: не удалось разобрать запись', err)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_imported_comments_bump_their_post(self):
+        post = Post.objects.create(text='Old', author=self.author)
+        started = timezone.now()
+        path = self.write('late.jsonl', json.dumps(
+            {'type': 'comment', 'post': post.pk, 'author': 'Reader',
+             'text': 'Hi'}))
+        self.run_import(path)
+        post.refresh_from_db()
+        self.assertEqual(post.version, 2)
+        self.assertGreaterEqual(post.updated, started)
+
+    def test_images_are_copied_into_media(self):
+        with open(os.path.join(self.tmp, 'small.gif'), 'wb') as file:
+            file.write(SMALL_GIF)
+        path = self.write('images.jsonl', json.dumps(
+            {'type': 'post', 'author': 'Writer', 'text': 'Pic',
+             'image': 'small.gif'}))
+        self.run_import(path, '--images', self.tmp)
+        post = Post.objects.get(text='Pic')
+        self.assertTrue(post.image.name.startswith('posts/small'))
+        self.assertTrue(os.path.exists(post.image.path))
+        self.assertTrue(post.thumbnail_ready)
+
+    def test_records_are_read_lazily(self):
+        """Чтение не загружает файл целиком."""
+        lines = iter(['{"type": "post"}\n', 'broken\n'])
+        records = importing.read_records(lines)
+        self.assertEqual(next(records), (1, {'type': 'post'}))
+        self.assertEqual(next(lines), 'broken\n')
+
+    def test_follows_are_idempotent(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        path = self.write('follows.jsonl', json.dumps(
+            {'type': 'follow', 'user': 'Reader', 'author': 'Writer'}))
+        out, _ = self.run_import(path)
+        self.assertIn('подписок 0', out)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.followers_count, 1)
+
+    def test_posts_with_taken_ids_are_updated(self):
+        """Правленый пост из повторной выгрузки обновляет существующий."""
+        post = Post.objects.create(text='Old', author=self.author,
+                                   group=self.group)
+        path = self.write('again.jsonl', '\n'.join(map(json.dumps, [
+            {'type': 'post', 'id': post.pk, 'author': 'Writer',
+             'text': 'Edited'},
+            {'type': 'post', 'id': post.pk + 1, 'author': 'Writer',
+             'text': 'New'},
+        ])))
+        out, err = self.run_import(path)
+        self.assertIn('постов 1', out)
+        self.assertIn('обновлено постов 1', out)
+        self.assertEqual(err, '')
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Edited')
+        self.assertIsNone(post.group)
+        self.assertEqual(post.version, 2)
+        self.assertEqual(self.group.posts.count(), 0)
+
+    def test_failed_import_still_rebuilds_timelines(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        path = self.write('broken.jsonl', '\n'.join(map(json.dumps, [
+            {'type': 'post', 'author': 'Writer', 'text': 'Saved'},
+            {'type': 'comment', 'post': 1, 'author': 'Reader',
+             'text': 'Hi'},
+        ])))
+        with mock.patch.object(importing.Importer, '_flush_comments',
+                               side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self.run_import(path)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post__text='Saved').exists())
@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+from ..paginator import FEED_ORDERING, CursorPaginator
+
+User = get_user_model()
+
+
+class FollowIntegrityTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+
+    def test_duplicate_follow_is_rejected(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.user, author=self.author)
+
+    def test_self_follow_is_rejected(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.user, author=self.user)
+
+    def test_repeated_follow_keeps_one_row(self):
+        """Повторная подписка не раздувает счётчики и ленту."""
+        Post.objects.create(text='Test_text', author=self.author)
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('posts:profile_follow',
+                      kwargs={'username': self.author.username})
+        client.get(url)
+        client.get(url)
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 1)
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.followers_count, 1)
+        self.assertEqual(TimelineEntry.objects.filter(user=self.user).count(),
+                         1)
+
+
+class FeedQueryPlanTest(TestCase):
+    """Ленты читаются по составным индексам, без сортировки в памяти."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Planner')
+        cls.group = Group.objects.create(title='Group', slug='group',
+                                         description='Test')
+        cls.post = Post.objects.create(text='Test_text', author=cls.user,
+                                       group=cls.group)
+        Comment.objects.create(post=cls.post, author=cls.user, text='Hi')
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_profile_feed(self):
+        self.assertUsesIndex(
+            self.user.posts.with_feed_data().order_by(*FEED_ORDERING)[:11],
+            'post_author_pub_date_idx')
+
+    def test_group_feed(self):
+        self.assertUsesIndex(
+            self.group.posts.with_feed_data().order_by(*FEED_ORDERING)[:11],
+            'post_group_pub_date_idx')
+
+    def test_profile_feed_cursor_page(self):
+        posts = self.user.posts.with_feed_data()
+        keyset = CursorPaginator(posts, 10)._keyset_filter(
+            [self.post.pub_date, self.post.id], descending=True)
+        self.assertUsesIndex(
+            posts.filter(keyset).order_by(*FEED_ORDERING)[:11],
+            'post_author_pub_date_idx')
+
+    def test_post_comments(self):
+        self.assertUsesIndex(self.post.comments.order_by('created'),
+                             'comment_post_created_idx')
+
+    def test_author_followers(self):
+        self.assertUsesIndex(
+            Follow.objects.filter(author=self.user).values('user'),
+            'follow_author_user_idx')
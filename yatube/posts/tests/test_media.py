@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from .. import media
+from ..models import Post
+
+User = get_user_model()
+
+SMALL_GIF = (b'\x47\x49\x46\x38\x39\x61\x02\x00'
+             b'\x01\x00\x80\x00\x00\x00\x00\x00'
+             b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+             b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+             b'\x0A\x00\x3B')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR),
+                   THUMBNAIL_PREGENERATE=False)
+class MediaServeTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Photographer')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        with mock.patch('posts.thumbnails.generate'):
+            self.post = Post.objects.create(
+                text='Photo', author=self.user,
+                image=SimpleUploadedFile('small.gif', SMALL_GIF,
+                                         content_type='image/gif'))
+        self.url = self.post.image.url
+
+    def test_file_is_served_with_long_lived_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), SMALL_GIF)
+        self.assertEqual(response['Content-Type'], 'image/gif')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        response = self.client.get(self.url,
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), SMALL_GIF[2:6])
+        self.assertEqual(response['Content-Range'],
+                         f'bytes 2-5/{len(SMALL_GIF)}')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(response.streaming_content), SMALL_GIF[-4:])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=1000-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_transfer_is_handed_to_front_end_server(self):
+        with mock.patch.object(media, 'MEDIA_SERVER', 'nginx'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-media/' + self.post.image.name)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Type'], 'image/gif')
+        with mock.patch.object(media, 'MEDIA_SERVER', 'apache'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], self.post.image.path)
+
+    def test_only_files_of_existing_posts_are_served(self):
+        stray = os.path.join(settings.MEDIA_ROOT, 'posts', 'stray.gif')
+        with open(stray, 'wb') as file:
+            file.write(SMALL_GIF)
+        for url in (settings.MEDIA_URL + 'posts/stray.gif',
+                    settings.MEDIA_URL + 'posts/../posts/stray.gif',
+                    settings.MEDIA_URL + 'cache/../posts/stray.gif',
+                    settings.MEDIA_URL + 'secret.txt'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+        self.client.get(self.url)
+        self.post.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
@@ -0,0 +1,141 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import metrics
+from ..models import Post
+
+User = get_user_model()
+
+METRICS_DIR = tempfile.mkdtemp()
+
+
+@override_settings(METRICS_DIR=METRICS_DIR)
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Metric')
+        Post.objects.create(text='Test_text', author=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    @staticmethod
+    def value(metric, *labels):
+        return metrics.collect().values.get((metric, labels), 0)
+
+    def test_request_is_recorded_under_url_name(self):
+        """Запрос учитывается под именем URL вместе с SQL и шаблонами."""
+        before = self.value('yatube_requests_total',
+                            'posts:index', 'GET', '200')
+        self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(self.value('yatube_requests_total',
+                                    'posts:index', 'GET', '200'),
+                         before + 1)
+        registry = metrics.collect()
+        queries = registry.values[('yatube_db_queries', ('posts:index',))]
+        self.assertGreater(sum(queries[:-1]), 0)
+        render = registry.values[('yatube_template_render_seconds',
+                                  ('posts:index',))]
+        self.assertGreater(render[-1], 0)
+
+    def test_page_cache_hits_are_counted(self):
+        url = reverse('posts:group', kwargs={'slug': 'missing'})
+        self.guest_client.get(reverse('posts:index'))
+        before = self.value('yatube_cache_requests_total',
+                            'posts:index', 'page', 'hit')
+        self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(self.value('yatube_cache_requests_total',
+                                    'posts:index', 'page', 'hit'),
+                         before + 1)
+        missing = self.value('yatube_requests_total',
+                             'posts:group', 'GET', '404')
+        self.guest_client.get(url)
+        self.assertEqual(self.value('yatube_requests_total',
+                                    'posts:group', 'GET', '404'),
+                         missing + 1)
+
+    def test_snapshots_of_other_processes_are_summed(self):
+        """/metrics складывает снимки всех процессов."""
+        before = self.value('yatube_requests_total',
+                            'posts:index', 'GET', '200')
+        path = os.path.join(METRICS_DIR, 'other.json')
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump([['yatube_requests_total',
+                        ['posts:index', 'GET', '200'], 5]], file)
+        try:
+            self.assertEqual(self.value('yatube_requests_total',
+                                        'posts:index', 'GET', '200'),
+                             before + 5)
+        finally:
+            os.remove(path)
+
+    def test_metrics_page_uses_prometheus_format(self):
+        staff = User.objects.create_user(username='Staff', is_staff=True)
+        client = Client()
+        client.force_login(staff)
+        client.get(reverse('posts:index'))
+        response = client.get(reverse('posts:metrics'))
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram',
+                      text)
+        self.assertIn('yatube_request_duration_seconds_bucket'
+                      '{view="posts:index",le="+Inf"}', text)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_page_needs_token_or_staff(self):
+        url = reverse('posts:metrics')
+        self.assertEqual(self.guest_client.get(url).status_code, 403)
+        response = self.guest_client.get(
+            url, HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 403)
+        response = self.guest_client.get(
+            url, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_snapshots_that_will_not_change_are_retired(self):
+        """Снимки завершившихся и давно молчащих процессов удаляются.
+
+        Их счётчики остаются в сумме, чтобы она не уменьшалась.
+        """
+        entries = [['yatube_requests_total',
+                    ['posts:index', 'GET', '200'], 5]]
+        before = self.value('yatube_requests_total',
+                            'posts:index', 'GET', '200')
+        # 2**22 больше предела pid в Linux: такого процесса нет.
+        dead = os.path.join(METRICS_DIR, f'{2 ** 22 + 1}-dead.json')
+        silent = os.path.join(METRICS_DIR, 'silent.json')
+        for path in (dead, silent):
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(entries, file)
+        old = time.time() - 2 * 60 * 60
+        os.utime(silent, (old, old))
+        for _ in range(2):
+            self.assertEqual(self.value('yatube_requests_total',
+                                        'posts:index', 'GET', '200'),
+                             before + 10)
+        self.assertFalse(os.path.exists(dead))
+        self.assertFalse(os.path.exists(silent))
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = metrics.Registry()
+        for value in (0, 1, 4, 1000):
+            registry.observe('yatube_db_queries', ('v',), value)
+        text = metrics.render(registry)
+        self.assertIn('yatube_db_queries_bucket{view="v",le="1"} 2', text)
+        self.assertIn('yatube_db_queries_bucket{view="v",le="5"} 3', text)
+        self.assertIn('yatube_db_queries_bucket{view="v",le="+Inf"} 4', text)
+        self.assertIn('yatube_db_queries_count{view="v"} 4', text)
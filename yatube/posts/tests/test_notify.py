@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+import resource
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from yatube import sse
+
+from .. import notify
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+async def read_event(reader):
+    lines = []
+    while True:
+        line = await asyncio.wait_for(reader.readline(), 5)
+        if line == b'\n':
+            if lines:
+                return lines
+            continue
+        lines.append(line.decode().rstrip('\n'))
+
+
+class HubTest(SimpleTestCase):
+    def test_events_reach_only_matching_scopes(self):
+        async def scenario():
+            hub = notify.Hub(queue_size=2)
+            cats = hub.subscribe(['group:cats'])
+            everyone = hub.subscribe(['index'])
+            hub.publish(1, ['index', 'author:5', 'group:dogs'])
+            hub.publish(2, ['index', 'author:5', 'group:cats'])
+            self.assertEqual(cats.queue.get_nowait(), 2)
+            self.assertTrue(cats.queue.empty())
+            hub.publish(3, ['index', 'author:6'])
+            self.assertTrue(everyone.dropped)
+            hub.unsubscribe(cats)
+            hub.unsubscribe(everyone)
+            self.assertEqual(hub.by_scope, {})
+            replay = hub.subscribe(['author:5'], last_id=1)
+            self.assertEqual(replay.queue.get_nowait(), 2)
+            self.assertTrue(replay.queue.empty())
+
+        asyncio.run(scenario())
+
+    def test_stream_delivers_published_datagrams(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'notify.sock')
+
+        async def scenario():
+            server = notify.Server(port=0, path=path, heartbeat=60)
+            await server.start()
+            try:
+                reader, writer = await asyncio.open_connection(
+                    '127.0.0.1', server.port)
+                writer.write(b'GET /events/?feed=group&group=cats HTTP/1.1'
+                             b'\r\nHost: localhost\r\n\r\n')
+                head = await reader.readuntil(b'\r\n\r\n')
+                self.assertIn(b'text/event-stream', head)
+                self.assertEqual(await read_event(reader), ['retry: 5000'])
+                while not server.hub.subscriptions:
+                    await asyncio.sleep(0.01)
+                for post_id, group in ((7, 'dogs'), (8, 'cats')):
+                    notify.send(json.dumps({
+                        'id': post_id, 'scopes': ['index', f'group:{group}'],
+                    }).encode(), path)
+                self.assertEqual(await read_event(reader),
+                                 ['id: 8', 'event: post', 'data: {"id": 8}'])
+                writer.close()
+            finally:
+                await server.close()
+            self.assertFalse(os.path.exists(path))
+            self.assertEqual(server.hub.subscriptions, set())
+
+        asyncio.run(scenario())
+
+    def test_cancelled_stream_is_closed_and_cancellation_propagates(self):
+        async def scenario():
+            hub = notify.Hub()
+            reader = asyncio.StreamReader()
+            reader.feed_data(b'GET /events/ HTTP/1.1\r\nHost: x\r\n\r\n')
+            writer = mock.Mock(drain=mock.AsyncMock())
+            task = asyncio.ensure_future(notify.handle(hub, reader, writer))
+            while not hub.subscriptions:
+                await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertEqual(hub.subscriptions, set())
+            writer.close.assert_called_once_with()
+
+        asyncio.run(scenario())
+
+
+class OpenFilesLimitTest(SimpleTestCase):
+    def test_unlimited_hard_limit_is_capped(self):
+        infinity = resource.RLIM_INFINITY
+        with mock.patch.object(resource, 'getrlimit',
+                               return_value=(1024, infinity)), \
+                mock.patch.object(resource, 'setrlimit') as setrlimit:
+            self.assertEqual(sse.raise_open_files_limit(), 65536)
+        setrlimit.assert_called_once_with(resource.RLIMIT_NOFILE,
+                                          (65536, infinity))
+
+    def test_refused_limit_is_logged(self):
+        with mock.patch.object(resource, 'getrlimit',
+                               return_value=(1024, 4096)), \
+                mock.patch.object(resource, 'setrlimit',
+                                  side_effect=ValueError('not allowed')), \
+                self.assertLogs('yatube.sse', 'WARNING'):
+            self.assertEqual(sse.raise_open_files_limit(), 1024)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR),
+                   THUMBNAIL_PREGENERATE=False)
+class PublishTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(title='Кошки', slug='cats',
+                                         description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_new_post_is_announced_after_commit(self):
+        client = Client()
+        client.force_login(self.author)
+        with mock.patch.object(notify.transaction, 'on_commit',
+                               side_effect=lambda callback: callback()), \
+                mock.patch.object(notify, 'send') as send:
+            client.post(reverse('posts:new_post'),
+                        {'text': 'Новый', 'group': self.group.pk})
+        post = Post.objects.get(text='Новый')
+        self.assertEqual(json.loads(send.call_args[0][0]), {
+            'id': post.id,
+            'scopes': ['index', f'author:{self.author.pk}', 'group:cats'],
+        })
+
+    def test_follow_feed_scopes_come_from_session(self):
+        client = Client()
+        client.force_login(self.reader)
+        session_key = client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.assertEqual(notify.reader_scopes(session_key),
+                         [f'author:{self.author.pk}'])
+        self.assertIsNone(notify.reader_scopes('missing'))
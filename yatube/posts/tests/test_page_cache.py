@@ -0,0 +1,140 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from .. import page_cache
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Writer')
+        cls.group = Group.objects.create(title='test_title',
+                                         slug='test_slug',
+                                         description='test_desc')
+        cls.post = Post.objects.create(text='first', author=cls.author,
+                                       group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_anonymous_page_is_shared_across_cookies(self):
+        self.guest_client.get(reverse('posts:index'))
+        other_client = Client()
+        other_client.cookies['sessionid'] = 'whatever'
+        response = other_client.get(reverse('posts:index'))
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+    def test_new_post_invalidates_feeds(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+        self.author_client.post(reverse('posts:new_post'),
+                                data={'text': 'second',
+                                      'group': self.group.id})
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response['X-Page-Cache'], 'miss')
+                self.assertContains(response, 'second')
+
+    def test_stale_page_is_served_while_regenerating(self):
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        page_cache.invalidate(page_cache.index_scope())
+        key = page_cache._page_key('index', 'anon',
+                                   RequestFactory().get(url))
+        cache.add(f'{key}:lock', 1)
+        response = self.guest_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'stale')
+
+    def test_follow_invalidates_profile(self):
+        reader_client = Client()
+        reader_client.force_login(User.objects.create_user(username='R'))
+        url = reverse('posts:profile',
+                      kwargs={'username': self.author.username})
+        reader_client.get(url)
+        response = reader_client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': self.author.username}),
+            follow=True)
+        self.assertContains(response, 'Отписаться')
+
+    def assertMissed(self, url):
+        response = self.guest_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        return response
+
+    def test_group_edit_invalidates_pages_of_its_posts(self):
+        """Правки вне представлений (админка, shell) тоже сбрасывают кэш."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'renamed_title'
+        group.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.assertMissed(url), 'renamed_title')
+
+    def test_regrouped_post_leaves_old_group_page(self):
+        other = Group.objects.create(title='other_title', slug='other_slug',
+                                     description='other_desc')
+        url = reverse('posts:group', kwargs={'slug': self.group.slug})
+        self.guest_client.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = other
+        post.save()
+        self.assertNotContains(self.assertMissed(url), 'first')
+
+    def test_deleted_comments_and_posts_invalidate_feeds(self):
+        url = reverse('posts:index')
+        comment = Comment.objects.create(post=self.post, author=self.author,
+                                         text='note')
+        self.guest_client.get(url)
+        comment.delete()
+        self.assertMissed(url)
+        Post.objects.get(pk=self.post.pk).delete()
+        self.assertNotContains(self.assertMissed(url), 'first')
+
+    def test_posts_created_outside_views_invalidate_feeds(self):
+        urls = (
+            reverse('posts:group', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+        Post.objects.create(text='from shell', author=self.author,
+                            group=self.group)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.assertMissed(url), 'from shell')
+
+    def test_local_memory_cache_keeps_pages_fresh_briefly(self):
+        """Сброс в LocMemCache не виден другим воркерам."""
+        self.assertEqual(page_cache.fresh_timeout(),
+                         page_cache.PAGE_CACHE_LOCAL_TIMEOUT)
+        dummy = {'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with override_settings(CACHES=dummy):
+            self.assertEqual(page_cache.fresh_timeout(),
+                             page_cache.PAGE_CACHE_TIMEOUT)
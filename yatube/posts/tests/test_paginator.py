@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post
+from ..paginator import CursorPaginator, WindowedPaginator, page_window
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Cursor')
+        for i in range(25):
+            Post.objects.create(text=f'Test_text{i}', author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_cursor_walks_whole_feed_without_duplicates(self):
+        """Курсор проходит всю ленту по порядку и без повторов."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.get_page(None)
+        seen = list(page.object_list)
+        while page.has_next():
+            page = paginator.get_page(page.next_cursor)
+            seen.extend(page.object_list)
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        self.assertEqual(seen, expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор назад возвращает предыдущую страницу."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first = paginator.get_page(None)
+        second = paginator.get_page(first.next_cursor)
+        back = paginator.get_page(second.previous_cursor)
+        self.assertEqual(list(back.object_list), list(first.object_list))
+        self.assertFalse(back.has_previous())
+
+    def test_cursor_page_does_not_count_rows(self):
+        """Курсорная страница обходится одним запросом без COUNT."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.get_page(None)
+        with self.assertNumQueries(1):
+            page = paginator.get_page(page.next_cursor)
+            list(page.object_list)
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        response = self.guest_client.get(
+            reverse('posts:index') + '?cursor=garbage')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['page'].has_previous())
+
+    def test_numbered_pages_are_still_available(self):
+        """Параметр page включает нумерованную паджинацию."""
+        response = self.guest_client.get(reverse('posts:index') + '?page=3')
+        page = response.context['page']
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page.object_list), 5)
+
+
+class WindowedPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Window')
+        Post.objects.bulk_create(Post(text=f'Post {i}', author=cls.user)
+                                 for i in range(25))
+
+    def setUp(self):
+        cache.clear()
+        self.paginator = WindowedPaginator(
+            Post.objects.order_by('-pub_date', '-id'), 2)
+
+    def test_window_has_bounded_length(self):
+        self.assertEqual(page_window(50, 100),
+                         [1, None, 48, 49, 50, 51, 52, None, 100])
+        self.assertEqual(page_window(2, 5), [1, 2, 3, 4, 5])
+        self.assertEqual(len(page_window(5000, 50000)),
+                         len(page_window(50, 500)))
+
+    def test_pages_are_located_without_counting_rows(self):
+        """COUNT(*) считается раз на таймаут, а не на каждую страницу."""
+        self.paginator.get_page(1)
+        with CaptureQueriesContext(connection) as queries:
+            page = self.paginator.get_page(4)
+        self.assertEqual(len(queries), 2)
+        self.assertFalse(any('COUNT' in query['sql'] for query in queries))
+        self.assertEqual(page.navigation, [1, 2, 3, 4, 5, 6, None, 13])
+        self.assertEqual(len(page.object_list), 2)
+
+    def test_page_past_the_end_is_the_last_page(self):
+        page = self.paginator.get_page(40)
+        self.assertEqual(page.number, 13)
+        self.assertEqual(len(page.object_list), 1)
+        self.assertFalse(page.has_next())
+        self.assertEqual(page.navigation, [1, None, 11, 12, 13])
+
+    def test_navigation_renders_only_the_window(self):
+        html = render_to_string('includes/paginator.html', {
+            'page': self.paginator.get_page(7),
+            'request': RequestFactory().get('/', {'page': 7}),
+        })
+        self.assertEqual(html.count('class="page-link" href="?page='), 6)
+        self.assertEqual(html.count('&hellip;'), 2)
@@ -0,0 +1,87 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .. import replicas
+from ..models import Post
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class PrimaryReplicaRouterTest(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Writer')
+        self.writer = Client()
+        self.writer.force_login(self.author)
+        Post.objects.create(text='Replicated', author=self.author)
+        self.replicate()
+
+    def replicate(self):
+        """Копирует основную базу в реплику, как это сделала бы репликация."""
+        for alias in ('default', 'replica'):
+            connections[alias].ensure_connection()
+        connections['default'].connection.backup(
+            connections['replica'].connection)
+        replicas._local.wrote = False
+
+    def texts(self, client):
+        response = client.get(reverse('posts:api_index'))
+        return [post['text'] for post in response.json()['results']]
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(router.db_for_read(Post), 'replica')
+        self.assertEqual(router.db_for_read(User), 'default')
+        self.assertEqual(router.db_for_write(Post), 'default')
+        Post.objects.using('replica').update(text='Only on replica')
+        self.assertEqual(self.texts(Client()), ['Only on replica'])
+
+    def test_writer_sticks_to_primary(self):
+        response = self.writer.post(reverse('posts:new_post'),
+                                    {'text': 'Fresh'})
+        self.assertIn(replicas.STICKY_COOKIE, response.cookies)
+        self.assertEqual(self.texts(self.writer), ['Fresh', 'Replicated'])
+        self.assertEqual(self.texts(Client()), ['Replicated'])
+        self.writer.cookies[replicas.STICKY_COOKIE] = '0'
+        self.assertEqual(self.texts(self.writer), ['Replicated'])
+        self.replicate()
+        self.assertEqual(self.texts(Client()), ['Fresh', 'Replicated'])
+
+    def test_reads_only_stick_after_writes(self):
+        response = Client().get(reverse('posts:api_index'))
+        self.assertNotIn(replicas.STICKY_COOKIE, response.cookies)
+
+    def test_transactions_and_blocks_read_primary(self):
+        with transaction.atomic():
+            self.assertEqual(router.db_for_read(Post), 'default')
+        with replicas.use_primary():
+            self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertEqual(router.db_for_read(Post), 'replica')
+
+    def test_background_work_does_not_keep_reads_on_primary(self):
+        """Запись в фоновой задаче закрепляет чтение только до её конца."""
+        with replicas.scope() as state:
+            Post.objects.create(text='Background', author=self.author)
+            self.assertTrue(state.wrote)
+            self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertEqual(router.db_for_read(Post), 'replica')
+
+    def test_primary_and_replica_are_separate_files(self):
+        names = {connections[alias].settings_dict['NAME']
+                 for alias in ('default', 'replica')}
+        self.assertEqual(len(names), 2)
+        for name in names:
+            self.assertTrue(os.path.isfile(name), name)
+
+    def test_invalidated_pages_render_from_primary(self):
+        """Страницу после сброса кэша не рисуют с отстающей реплики."""
+        self.writer.post(reverse('posts:new_post'), {'text': 'Fresh'})
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, 'Fresh')
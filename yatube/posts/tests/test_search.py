@@ -0,0 +1,99 @@
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Writer')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(title='test_title',
+                                         slug='test_slug',
+                                         description='test_desc')
+        cls.match = Post.objects.create(text='Кошка спит на диване',
+                                        author=cls.user, group=cls.group)
+        cls.weak_match = Post.objects.create(
+            text='Собака и кошка. ' + 'Длинный текст. ' * 20,
+            author=cls.other)
+        Post.objects.create(text='Собака гуляет', author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, **params):
+        response = self.guest_client.get(reverse('posts:search'), params)
+        return list(response.context['page'].object_list)
+
+    def test_results_are_ranked(self):
+        self.assertEqual(self.search(q='кошка'),
+                         [self.match, self.weak_match])
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.create(text='черепаха', author=self.user)
+        self.assertEqual(self.search(q='черепаха'), [post])
+        post.text = 'ёж'
+        post.save()
+        self.assertEqual(self.search(q='черепаха'), [])
+        post.delete()
+        self.assertEqual(self.search(q='ёж'), [])
+
+    def test_filters_by_group_and_author(self):
+        self.assertEqual(self.search(q='кошка', group=self.group.slug),
+                         [self.match])
+        self.assertEqual(self.search(q='кошка', author=self.other.username),
+                         [self.weak_match])
+
+    def test_cursor_pages_keep_query(self):
+        for i in range(12):
+            Post.objects.create(text=f'жираф {i}', author=self.user)
+        response = self.guest_client.get(reverse('posts:search'),
+                                         {'q': 'жираф'})
+        page = response.context['page']
+        self.assertContains(response, 'q=%D0%B6%D0%B8%D1%80%D0%B0%D1%84')
+        second = self.search(q='жираф', cursor=page.next_cursor)
+        self.assertEqual(len(page.object_list) + len(second), 12)
+        self.assertFalse(set(page.object_list) & set(second))
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self.search(q='"кошка OR'), [])
+
+    def test_admin_uses_index(self):
+        admin = site._registry[Post]
+        request = RequestFactory().get('/admin/posts/post/')
+        queryset, use_distinct = admin.get_search_results(
+            request, Post.objects.all(), 'диване')
+        self.assertEqual(list(queryset), [self.match])
+        self.assertIn('MATCH', str(queryset.query))
+
+
+class SearchTriggersTest(TestCase):
+    def triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master "
+                           "WHERE type = 'trigger'")
+            return {name for name, in cursor.fetchall()}
+
+    def test_triggers_exist_after_migrate(self):
+        self.assertLessEqual(set(search.FTS_TRIGGERS), self.triggers())
+
+    def test_lost_triggers_are_restored_after_migrate(self):
+        """Пересоздание posts_post в будущей миграции не ломает поиск."""
+        user = User.objects.create_user(username='Writer')
+        with connection.cursor() as cursor:
+            for name in search.FTS_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER {name}')
+        post = Post.objects.create(text='Кошка без триггера', author=user)
+        emit_post_migrate_signal(verbosity=0, interactive=False,
+                                 db=connection.alias)
+        self.assertLessEqual(set(search.FTS_TRIGGERS), self.triggers())
+        self.assertEqual(list(search.search_posts('кошка')), [post])
@@ -0,0 +1,61 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+
+class SQLiteBackendTest(SimpleTestCase):
+    # Тесты открывают собственные соединения, но pytest-django пускает к
+    # базе только тесты с объявленными databases.
+    databases = {'default'}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.path = os.path.join(self.directory, 'db.sqlite3')
+
+    def wrapper(self, **settings):
+        connection = ConnectionHandler({'default': {
+            'ENGINE': 'posts.backends.sqlite3', 'NAME': self.path,
+            'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True, **settings,
+        }})['default']
+        self.addCleanup(connection.close)
+        connection.ensure_connection()
+        return connection
+
+    def pragma(self, connection, name):
+        return connection.connection.execute(f'PRAGMA {name}').fetchone()[0]
+
+    def test_new_connections_are_tuned(self):
+        connection = self.wrapper(OPTIONS={'pragmas': {'busy_timeout': 100}})
+        self.assertEqual(self.pragma(connection, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(connection, 'synchronous'), 1)
+        self.assertEqual(self.pragma(connection, 'busy_timeout'), 100)
+
+    def test_transactions_take_write_lock_immediately(self):
+        connection = self.wrapper()
+        connection._start_transaction_under_autocommit()
+        other = sqlite3.connect(self.path, timeout=0)
+        self.addCleanup(other.close)
+        with self.assertRaisesMessage(sqlite3.OperationalError, 'locked'):
+            other.execute('BEGIN IMMEDIATE')
+        connection.connection.execute('ROLLBACK')
+
+    def test_unknown_transaction_mode_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.wrapper(OPTIONS={'transaction_mode': 'lazy'})
+
+    def test_health_check_drops_connection_to_replaced_file(self):
+        """Соединение к подменённому файлу базы закрывается."""
+        connection = self.wrapper()
+        connection.close_if_unusable_or_obsolete()
+        self.assertIsNotNone(connection.connection)
+        replacement = os.path.join(self.directory, 'restored.sqlite3')
+        sqlite3.connect(replacement).close()
+        os.replace(replacement, self.path)
+        connection.close_if_unusable_or_obsolete()
+        self.assertIsNone(connection.connection)
@@ -0,0 +1,55 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import AuthorStats, Follow, Post
+
+User = get_user_model()
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+
+    def get_stats(self, user):
+        return AuthorStats.objects.get(pk=user.pk)
+
+    def test_post_counter_follows_create_and_delete(self):
+        post = Post.objects.create(text='text', author=self.author)
+        self.assertEqual(self.get_stats(self.author).posts_count, 1)
+        post.delete()
+        self.assertEqual(self.get_stats(self.author).posts_count, 0)
+
+    def test_follow_counters_follow_create_and_delete(self):
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.get_stats(self.author).followers_count, 1)
+        self.assertEqual(self.get_stats(self.user).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.get_stats(self.author).followers_count, 0)
+        self.assertEqual(self.get_stats(self.user).following_count, 0)
+
+    def test_profile_shows_stored_counters(self):
+        Post.objects.create(text='text', author=self.author)
+        Follow.objects.create(user=self.user, author=self.author)
+        response = Client().get(
+            reverse('posts:profile', kwargs={'username': self.author.username})
+        )
+        self.assertContains(response, 'Подписчиков: 1')
+        self.assertContains(response, 'Записей: 1')
+
+    def test_reconcile_repairs_drift(self):
+        Post.objects.create(text='text', author=self.author)
+        AuthorStats.objects.filter(pk=self.author.pk).update(
+            posts_count=42, followers_count=7)
+        AuthorStats.objects.filter(pk=self.user.pk).delete()
+        call_command('reconcile_author_stats', batch_size=1,
+                     stdout=StringIO())
+        stats = self.get_stats(self.author)
+        self.assertEqual((stats.posts_count, stats.followers_count), (1, 0))
+        self.assertTrue(AuthorStats.objects.filter(pk=self.user.pk).exists())
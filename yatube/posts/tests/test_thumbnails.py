@@ -0,0 +1,132 @@
+import json
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+SMALL_GIF = (b'\x47\x49\x46\x38\x39\x61\x02\x00'
+             b'\x01\x00\x80\x00\x00\x00\x00\x00'
+             b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+             b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+             b'\x0A\x00\x3B')
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def fake_thumbnail(image, geometry, **options):
+    width, height = map(int, geometry.split('x'))
+    return SimpleNamespace(name=f'cache/{geometry}.jpg', width=width,
+                           height=height)
+
+
+@override_settings(THUMBNAIL_PREGENERATE=False, MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailPregenerationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Writer')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self):
+        uploaded = SimpleUploadedFile(name='small.gif', content=SMALL_GIF,
+                                      content_type='image/gif')
+        self.authorized_client.post(reverse('posts:new_post'),
+                                    data={'text': 'text', 'image': uploaded})
+        return Post.objects.get(text='text')
+
+    @mock.patch('posts.thumbnails.get_thumbnail', side_effect=fake_thumbnail)
+    def test_new_post_generates_thumbnail(self, get_thumbnail):
+        post = self.create_post()
+        self.assertEqual(get_thumbnail.call_count,
+                         len(thumbnails.FEED_WIDTHS))
+        self.assertTrue(post.thumbnail_ready)
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+        self.assertEqual(
+            [size['width'] for size in post.feed_image['sizes']],
+            list(thumbnails.FEED_WIDTHS))
+        self.assertTrue(post.feed_image['placeholder'].startswith(
+            'data:image/webp;base64,'))
+
+    @mock.patch('posts.thumbnails.get_thumbnail', side_effect=fake_thumbnail)
+    def test_feed_renders_srcset_without_storage(self, get_thumbnail):
+        self.create_post()
+        cache.clear()
+        with mock.patch.object(FileSystemStorage, 'open',
+                               side_effect=AssertionError), \
+                mock.patch.object(FileSystemStorage, 'exists',
+                                  side_effect=AssertionError):
+            response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'cache/320x113.jpg 320w, ')
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, 'loading="lazy"')
+
+    @mock.patch('posts.thumbnails.get_thumbnail', side_effect=OSError)
+    def test_placeholder_until_thumbnail_is_ready(self, get_thumbnail):
+        post = self.create_post()
+        self.assertFalse(post.thumbnail_ready)
+        response = self.authorized_client.get(
+            reverse('posts:post', kwargs={'username': self.user.username,
+                                          'post_id': post.id}))
+        self.assertContains(response, 'card-img bg-light')
+
+
+class ThumbnailPrefetchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Writer')
+        cls.posts = [
+            Post.objects.create(text=f'text{i}', author=cls.user,
+                                image=f'posts/{i}.jpg', thumbnail_ready=True)
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_key_matches_sorl_lookup(self):
+        """Ключ совпадает с тем, что ищет сам sorl."""
+        with mock.patch.object(default.kvstore, 'get') as kvstore_get:
+            get_thumbnail(self.posts[0].image, thumbnails.FEED_GEOMETRY,
+                          **thumbnails.FEED_OPTIONS)
+        sorl_key = add_prefix(kvstore_get.call_args[0][0].key)
+        self.assertEqual(
+            thumbnails._feed_thumbnail_key(self.posts[0].image), sorl_key)
+
+    def test_prefetch_uses_one_query_for_page(self):
+        for i, post in enumerate(self.posts):
+            KVStore.objects.create(
+                key=thumbnails._feed_thumbnail_key(post.image),
+                value=json.dumps({'name': f'cache/{i}.jpg',
+                                  'storage': 'x', 'size': [960, 339]}))
+        with self.assertNumQueries(1):
+            posts = thumbnails.prefetch(self.posts)
+        self.assertEqual(posts[2].feed_thumbnail['url'],
+                         settings.MEDIA_URL + 'cache/2.jpg')
+        with self.assertNumQueries(0):
+            thumbnails.prefetch(self.posts)
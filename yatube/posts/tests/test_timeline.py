@@ -0,0 +1,60 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.old_post = Post.objects.create(text='old', author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def follow(self):
+        self.authorized_client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': self.author.username}))
+
+    def timeline_posts(self):
+        return list(TimelineEntry.objects.filter(user=self.user)
+                    .values_list('post_id', flat=True))
+
+    def test_follow_backfills_existing_posts(self):
+        self.follow()
+        self.assertEqual(self.timeline_posts(), [self.old_post.id])
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        self.follow()
+        author_client = Client()
+        author_client.force_login(self.author)
+        author_client.post(reverse('posts:new_post'), data={'text': 'new'})
+        new_post = Post.objects.get(text='new')
+        self.assertEqual(self.timeline_posts(),
+                         [new_post.id, self.old_post.id])
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page'][0], new_post)
+
+    def test_unfollow_prunes_timeline(self):
+        self.follow()
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': self.author.username}))
+        self.assertEqual(self.timeline_posts(), [])
+
+    def test_rebuild_command_restores_timelines(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.timeline_posts(), [self.old_post.id])
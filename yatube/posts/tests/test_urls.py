@@ -108,13 +108,14 @@ class PostUrlTests(TestCase):
             self.templates_url_names['posts/new.html']['edit'])
         self.assertEqual(response.status_code, 200)
 
-    def test_post_edit_page_exists_for_not_author(self):
-        """Страница /<username>/<post_id>/edit доступна для
-        авторизованного пользователя - НЕ автора поста.
+    def test_post_edit_page_redirects_not_author(self):
+        """Страница /<username>/<post_id>/edit перенаправляет
+        авторизованного пользователя - НЕ автора поста на страницу поста.
         """
         response = self.second_authorized_client.get(
             self.templates_url_names['posts/new.html']['edit'])
-        self.assertEqual(response.status_code, 200)
+        self.assertRedirects(response,
+                             self.templates_url_names['posts/post.html'])
 
     def test_post_edit_page_uses_correct_template(self):
         """Страница edit использует правильный шаблон"""
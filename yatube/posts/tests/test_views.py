@@ -6,10 +6,10 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from ..models import Comment, Group, Post
+from ..models import Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -333,28 +333,25 @@ class CacheTestView(TestCase):
         response = self.authorized_client.get(reverse('posts:index'))
         # контент по дефолту
         content_before_new = response.content
+        response = self.authorized_client.get(reverse('posts:index'))
+        # повторный запрос отдан из кэша
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertEqual(response.content, content_before_new)
+        # новый пост сбрасывает кэш, даже созданный в обход представлений
         Post.objects.create(text='qwerty', author=self.user)
         response = self.authorized_client.get(reverse('posts:index'))
-        # взял контент с новым постом.
         content_after_new = response.content
-        # сравнил, они равны - кэш работает
-        self.assertEqual(
-            content_after_new, content_before_new
-        )
-        # почистил кэш взял контент, он не равен с первоначальным
-        cache.clear()
-        response = self.authorized_client.get(reverse('posts:index'))
-        content_after_cache_clear = response.content
         self.assertNotEqual(
-            content_before_new, content_after_cache_clear
+            content_before_new, content_after_new
         )
+        self.assertContains(response, 'qwerty')
 
 
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
 class ImagesTest(TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
-        settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
         cls.user = User.objects.create_user(username='TestBro')
         cls.group = Group.objects.create(title='test_title',
                                          slug='test_slug',
@@ -421,3 +418,57 @@ class ImagesTest(TestCase):
         self.assertEqual(
             response.context['post'].image, self.post.image
         )
+
+
+class FeedQueriesTest(TestCase):
+    """Число запросов ленты не зависит от количества постов на странице."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.group = Group.objects.create(title='test_title',
+                                         slug='test_slug',
+                                         description='test_desc')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        # Вместе с запросами валидаторов ETag (см. posts.conditional).
+        cls.expected_queries = {
+            reverse('posts:index'): 4,
+            reverse('posts:group', kwargs={'slug': cls.group.slug}): 5,
+            reverse('posts:follow_index'): 5,
+            reverse('posts:profile',
+                    kwargs={'username': cls.author.username}): 7,
+        }
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def add_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(text=f'Test_text{i}',
+                                       author=self.author,
+                                       group=self.group)
+            Comment.objects.create(post=post, author=self.user, text='c')
+
+    def assert_feed_queries(self):
+        for url, expected in self.expected_queries.items():
+            with self.subTest(url=url):
+                cache.clear()
+                with self.assertNumQueries(expected):
+                    self.authorized_client.get(url)
+
+    def test_feed_queries_with_one_post(self):
+        self.add_posts(1)
+        self.assert_feed_queries()
+
+    def test_feed_queries_with_full_page(self):
+        self.add_posts(15)
+        self.assert_feed_queries()
+
+    def test_comment_count_is_annotated(self):
+        self.add_posts(1)
+        cache.clear()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(response.context['page'][0].comment_count, 1)
+        self.assertContains(response, 'Комментариев: 1')
@@ -0,0 +1,185 @@
+"""Фоновая подготовка миниатюр постов.
+
+Миниатюры для ленты считают сразу после сохранения картинки в пуле
+потоков, а не в первом GET-запросе, который покажет пост. Пока они не
+готовы, шаблоны показывают заглушку.
+
+Для каждой картинки считается кадр ленты нескольких ширин
+(``FEED_WIDTHS``) и крошечная размытая заглушка, которая встраивается
+в страницу как data: URI. Имена файлов, размеры и заглушка пишутся
+в ``Post.image_variants``, и шаблон рисует ``srcset`` без обращения
+к хранилищу и хранилищу ключей sorl.
+"""
+import base64
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageFilter, ImageOps
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from . import page_cache, replicas
+from .models import Post
+
+FEED_GEOMETRY = "960x339"
+FEED_OPTIONS = {"crop": "center", "upscale": True}
+FEED_WIDTHS = (320, 640, 960)
+PLACEHOLDER_SIZE = (24, 8)
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "THUMBNAIL_WORKERS", 2),
+            thread_name_prefix="thumbnails",
+        )
+    return _executor
+
+
+def generate(post_id):
+    """Считает варианты миниатюры и заглушку поста, отмечает его готовым."""
+    try:
+        # Пост только что записан: реплика может его ещё не знать.
+        with replicas.use_primary():
+            post = Post.objects.select_related("author", "group").get(
+                pk=post_id)
+        if not post.image:
+            return
+        sizes = []
+        for width in FEED_WIDTHS:
+            thumbnail = get_thumbnail(post.image, _feed_geometry(width),
+                                      **FEED_OPTIONS)
+            sizes.append([thumbnail.name, thumbnail.width, thumbnail.height])
+        (image_width, image_height), placeholder = _inspect(post.image)
+        Post.objects.filter(pk=post_id, image=post.image.name).update(
+            thumbnail_ready=True, image_width=image_width,
+            image_height=image_height,
+            image_variants=json.dumps({"sizes": sizes,
+                                       "placeholder": placeholder}),
+            version=F("version") + 1, updated=timezone.now()
+        )
+        page_cache.invalidate_post(post)
+    except Exception:
+        logger.exception("Не удалось подготовить миниатюру поста %s",
+                         post_id)
+
+
+def _work(post_id):
+    """Задача пула: свои соединения и свой признак записи для реплик."""
+    close_old_connections()
+    try:
+        with replicas.scope():
+            generate(post_id)
+    finally:
+        close_old_connections()
+
+
+def _feed_geometry(width):
+    full_width, full_height = map(int, FEED_GEOMETRY.split("x"))
+    return f"{width}x{round(width * full_height / full_width)}"
+
+
+def _inspect(image_file):
+    """Размеры картинки и размытая заглушка кадра ленты как data: URI."""
+    with image_file.open("rb"), Image.open(image_file) as image:
+        size = image.size
+        image.draft("RGB", (PLACEHOLDER_SIZE[0] * 8,
+                            PLACEHOLDER_SIZE[1] * 8))
+        tiny = ImageOps.fit(image.convert("RGB"), PLACEHOLDER_SIZE,
+                            Image.BOX)
+    buffer = BytesIO()
+    tiny.filter(ImageFilter.GaussianBlur(1)).save(buffer, "WEBP",
+                                                  quality=40)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return size, f"data:image/webp;base64,{encoded}"
+
+
+def schedule(post):
+    """Ставит подготовку миниатюры в очередь после коммита транзакции.
+
+    При ``THUMBNAIL_PREGENERATE = False`` миниатюра считается сразу,
+    в том же потоке.
+    """
+    if not post.image:
+        return
+    if not getattr(settings, "THUMBNAIL_PREGENERATE", True):
+        generate(post.pk)
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_work, post.pk))
+
+
+def _feed_thumbnail_key(image):
+    """Ключ sorl для миниатюры ленты, посчитанный без обращения к файлам.
+
+    Повторяет подготовку опций из ``ThumbnailBackend.get_thumbnail``.
+    """
+    backend = default.backend
+    source = ImageFile(image)
+    options = dict(FEED_OPTIONS)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault("format", backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, FEED_GEOMETRY, options)
+    return add_prefix(ImageFile(name, default.storage).key)
+
+
+def _load_raw(keys):
+    """Значения хранилища sorl для всех ключей: кэш, затем одна выборка."""
+    kv_cache = getattr(default.kvstore, "cache", None)
+    if kv_cache is None:
+        return {key: default.kvstore._get_raw(key) for key in keys}
+    values = kv_cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(KVStore.objects.filter(key__in=missing)
+                     .values_list("key", "value"))
+        kv_cache.set_many(found, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(found)
+    return {key: value for key, value in values.items()
+            if isinstance(value, (str, bytes))}
+
+
+def prefetch(posts):
+    """Прикрепляет к постам готовые миниатюры ленты одним запросом.
+
+    Нужно только постам без ``image_variants``, например загруженным
+    импортом. Найденная миниатюра лежит в ``post.feed_thumbnail`` (url,
+    width, height), и шаблон рисует её без обращения к хранилищу. Для
+    остальных постов шаблон по-прежнему вызывает тег ``thumbnail``.
+    """
+    posts = list(posts)
+    by_key = {}
+    for post in posts:
+        post.feed_thumbnail = None
+        if post.image and post.thumbnail_ready and not post.image_variants:
+            by_key.setdefault(_feed_thumbnail_key(post.image), []).append(post)
+    if not by_key:
+        return posts
+    for key, value in _load_raw(list(by_key)).items():
+        data = json.loads(value)
+        width, height = data["size"]
+        thumbnail = {"url": default.storage.url(data["name"]),
+                     "width": width, "height": height}
+        for post in by_key[key]:
+            post.feed_thumbnail = thumbnail
+    return posts
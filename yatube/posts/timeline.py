@@ -0,0 +1,110 @@
+"""Материализованная лента подписок.
+
+Каждый новый пост раскладывается в ``TimelineEntry`` всех подписчиков
+автора, поэтому ``follow_index`` читает ленту одним диапазоном по индексу
+``(user, pub_date)`` вместо соединения подписок с постами.
+
+Записи вставляются запросами INSERT ... SELECT прямо в базе, без
+создания объектов в Python.
+"""
+from django.db import connection
+
+from . import counts
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 1000
+
+
+def _insert_select(select_sql, params):
+    """INSERT ... SELECT в ленты, пропуская уже существующие записи.
+
+    Возвращает число добавленных записей.
+    """
+    ops = connection.ops
+    columns = ", ".join(ops.quote_name(name) for name in
+                        ("user_id", "post_id", "author_id", "pub_date"))
+    sql = "{} {} ({}) {} {}".format(
+        ops.insert_statement(ignore_conflicts=True),
+        ops.quote_name(TimelineEntry._meta.db_table),
+        columns,
+        select_sql,
+        ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def fan_out(post):
+    """Добавляет пост в ленты всех подписчиков его автора."""
+    quote = connection.ops.quote_name
+    _insert_select(
+        "SELECT DISTINCT {user}, %s, %s, %s FROM {follow} "
+        "WHERE {author} = %s".format(
+            user=quote("user_id"), author=quote("author_id"),
+            follow=quote(Follow._meta.db_table)),
+        [post.id, post.author_id,
+         connection.ops.adapt_datetimefield_value(post.pub_date),
+         post.author_id],
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика все посты автора; возвращает их число."""
+    quote = connection.ops.quote_name
+    return _insert_select(
+        "SELECT %s, {id}, {author}, {pub_date} FROM {post} "
+        "WHERE {author} = %s".format(
+            id=quote("id"), author=quote("author_id"),
+            pub_date=quote("pub_date"), post=quote(Post._meta.db_table)),
+        [user_id, author_id],
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает посты автора из ленты бывшего подписчика.
+
+    Возвращает число удалённых записей.
+    """
+    deleted, _ = TimelineEntry.objects.filter(user_id=user_id,
+                                              author_id=author_id).delete()
+    return deleted
+
+
+def rebuild(user_ids=None, batch_size=BATCH_SIZE):
+    """Пересобирает ленты с нуля; возвращает число пересобранных лент.
+
+    Ленты заполняются пачками по ``batch_size`` подписчиков, каждая пачка —
+    один INSERT ... SELECT по соединению подписок с постами.
+    """
+    entries = TimelineEntry.objects.all()
+    followers = Follow.objects.order_by("user_id")
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+        followers = followers.filter(user_id__in=user_ids)
+    entries.delete()
+    counts.forget(counts.FOLLOW, user_ids)
+    quote = connection.ops.quote_name
+    select_sql = (
+        "SELECT f.{user}, p.{id}, p.{author}, p.{pub_date} "
+        "FROM {follow} f INNER JOIN {post} p ON p.{author} = f.{author} "
+        "WHERE f.{user} IN ({{}})"
+    ).format(user=quote("user_id"), id=quote("id"),
+             author=quote("author_id"), pub_date=quote("pub_date"),
+             follow=quote(Follow._meta.db_table),
+             post=quote(Post._meta.db_table))
+    ids = list(followers.values_list("user_id", flat=True).distinct())
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        _insert_select(select_sql.format(", ".join(["%s"] * len(batch))),
+                       batch)
+    return len(ids)
+
+
+def posts_for(entries, queryset=None):
+    """Посты для записей ленты в том же порядке, что и записи."""
+    if queryset is None:
+        queryset = Post.objects.with_feed_data()
+    posts = queryset.in_bulk([entry.post_id for entry in entries])
+    return [posts[entry.post_id] for entry in entries
+            if entry.post_id in posts]
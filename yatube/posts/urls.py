@@ -1,10 +1,19 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
 urlpatterns = [
+    path('api/v1/posts/', api.index, name='api_index'),
+    path('api/v1/posts/<int:post_id>/', api.post_detail, name='api_post'),
+    path('api/v1/posts/<int:post_id>/comments/', api.comments,
+         name='api_comments'),
+    path('api/v1/groups/<slug:slug>/posts/', api.group_posts,
+         name='api_group'),
+    path('api/v1/users/<str:username>/posts/', api.profile,
+         name='api_profile'),
+    path('api/v1/follow/posts/', api.follow_index, name='api_follow_index'),
     path('follow/', views.follow_index, name="follow_index"),
     path('<str:username>/follow/', views.profile_follow,
          name="profile_follow"),
@@ -12,6 +21,11 @@ urlpatterns = [
          name="profile_unfollow"),
     path('<str:username>/<int:post_id>/comment',
          views.add_comment, name='add_comment'),
+    path('<str:username>/<int:post_id>/comments/',
+         views.comments, name='comments'),
+    path('search/', views.search_posts, name='search'),
+    path('cache/cards/', views.card_cache_stats, name='card_cache_stats'),
+    path('metrics', views.metrics_view, name='metrics'),
     path('400/', views.page_not_found, name='page_not_found'),
     path('500/', views.server_error, name='server_error'),
     path('', views.index, name='index'),
@@ -1,21 +1,92 @@
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db.models import Exists, OuterRef
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.urls import reverse
+from django.utils.http import urlencode
 
+from . import (cards, counts, metrics, notify, page_cache, search, stats,
+               thumbnails, timeline)
+from .conditional import (POST_FIELDS, TIMELINE_FIELDS, conditional,
+                          make_state)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
+from .models import Comment, Follow, Group, Post, TimelineEntry
+from .paginator import (COMMENT_ORDERING, COMMENTS_PER_PAGE, FEED_ORDERING,
+                        TIMELINE_ORDERING, CursorPaginator, page_rows,
+                        paginate)
 
 User = get_user_model()
 
+AUTHOR_FIELDS = ("first_name", "last_name", "stats__posts_count",
+                 "stats__followers_count", "stats__following_count")
 
-@cache_page(20, key_prefix="index_page")
+
+def _feed_state(request, object_list, fields=POST_FIELDS,
+                ordering=FEED_ORDERING, extra=(), count=None):
+    """Валидаторы страницы ленты для данного читателя."""
+    reader = page_cache.audience(request)
+    if reader is None:
+        return None, None
+    rows, navigation = page_rows(request, object_list, fields,
+                                 ordering=ordering, count=count)
+    return make_state(rows, reader, *navigation, *extra)
+
+
+def _following(request, author_ref):
+    return Exists(Follow.objects.filter(user=request.user,
+                                        author=OuterRef(author_ref)))
+
+
+def _author_counter(username):
+    def count():
+        author = User.objects.filter(username=username).first()
+        return counts.get(counts.AUTHOR, author) if author else 0
+    return count
+
+
+def _group_counter(slug):
+    def count():
+        group_id = (Group.objects.filter(slug=slug)
+                    .values_list("pk", flat=True).first())
+        return counts.get(counts.GROUP, group_id) if group_id else 0
+    return count
+
+
+def _profile_state(request, username):
+    # Шапка профиля: имя, счётчики и подписка читателя.
+    authors = User.objects.filter(username=username)
+    fields = list(AUTHOR_FIELDS)
+    if request.user.is_authenticated:
+        authors = authors.annotate(is_followed=_following(request, "pk"))
+        fields.append("is_followed")
+    return _feed_state(request,
+                       Post.objects.filter(author__username=username),
+                       extra=list(authors.values_list(*fields)),
+                       count=_author_counter(username))
+
+
+def _post_state(request, username, post_id):
+    # Версия поста растёт с каждым новым и удалённым комментарием.
+    reader = page_cache.audience(request)
+    if reader is None:
+        return None, None
+    posts = Post.objects.filter(id=post_id, author__username=username)
+    fields = [f"author__{name}" for name in AUTHOR_FIELDS]
+    if request.user.is_authenticated:
+        posts = posts.annotate(is_followed=_following(request, "author"))
+        fields.append("is_followed")
+    return make_state(list(posts.values_list(*fields, *POST_FIELDS)), reader)
+
+
+@conditional(lambda request: _feed_state(
+    request, Post.objects.all(), count=counts.counter(counts.INDEX)))
+@page_cache.cached_page(page_cache.index_scope)
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.with_feed_data()
+    page = paginate(request, post_list, count=counts.counter(counts.INDEX))
+    page.object_list = thumbnails.prefetch(page.object_list)
     return render(
         request,
         "index.html",
@@ -23,56 +94,99 @@ def index(request):
     )
 
 
+@conditional(lambda request, slug: _feed_state(
+    request, Post.objects.filter(group__slug=slug),
+    count=_group_counter(slug)))
+@page_cache.cached_page(page_cache.group_scope)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    post_list = group.posts.with_feed_data()
+    page = paginate(request, post_list,
+                    count=counts.counter(counts.GROUP, group.pk))
+    page.object_list = thumbnails.prefetch(page.object_list)
     return render(request, "group.html", {"group": group, "page": page})
 
 
+@conditional(_profile_state)
+@page_cache.cached_page(page_cache.profile_scope)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    posts_count = author.posts.count()
-    follower_count = author.follower.count()
-    following_count = author.following.count()
+    author = get_object_or_404(User.objects.select_related("stats"),
+                               username=username)
+    post_list = author.posts.with_feed_data()
+    author_stats = stats.get_stats(author)
     following = False
     if request.user.is_authenticated:
         following = Follow.objects.filter(user=request.user,
                                           author=author).exists()
-    page = paginator.get_page(page_number)
+    page = paginate(request, post_list,
+                    count=counts.counter(counts.AUTHOR, author))
+    page.object_list = thumbnails.prefetch(page.object_list)
     return render(request, "profile.html", {"author": author,
                                             "page": page,
-                                            "posts_count": posts_count,
-                                            "follower_count": follower_count,
-                                            "following_count": following_count,
+                                            "stats": author_stats,
                                             "following": following})
 
 
+def search_posts(request):
+    query = request.GET.get("q", "").strip()
+    post_list = Post.objects.with_feed_data()
+    group = author = None
+    if request.GET.get("group"):
+        group = get_object_or_404(Group, slug=request.GET["group"])
+        post_list = post_list.filter(group=group)
+    if request.GET.get("author"):
+        author = get_object_or_404(User, username=request.GET["author"])
+        post_list = post_list.filter(author=author)
+    post_list = search.search_posts(query, post_list)
+    page = paginate(request, post_list, ordering=search.SEARCH_ORDERING)
+    page.object_list = thumbnails.prefetch(page.object_list)
+    return render(request, "search.html", {"query": query,
+                                           "group": group,
+                                           "author": author,
+                                           "page": page})
+
+
+@conditional(_post_state)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post.objects.select_related("author"), id=post_id,
-                             author__username=username)
+    post = get_object_or_404(
+        Post.objects.with_feed_data().select_related("author__stats"),
+        id=post_id, author__username=username
+    )
     form = CommentForm(instance=None)
-    comments = post.comments.select_related("author").all()
-    posts_count = post.author.posts.count()
-    follower_count = post.author.follower.count()
-    following_count = post.author.following.count()
+    author_stats = stats.get_stats(post.author)
     following = False
     if request.user.is_authenticated:
         following = Follow.objects.filter(user=request.user,
                                           author=post.author).exists()
-    return render(request, "post.html", {"comments": comments,
-                                         "author": post.author,
+    return render(request, "post.html", {"author": post.author,
                                          "post": post,
                                          "form": form,
-                                         "posts_count": posts_count,
-                                         "follower_count": follower_count,
-                                         "following_count": following_count,
-                                         "following": following})
+                                         "stats": author_stats,
+                                         "following": following,
+                                         **_comment_chunk(post)})
+
+
+def _comment_chunk(post, cursor=None):
+    """Очередная порция комментариев и адрес следующей."""
+    comments = Comment.objects.filter(post_id=post.id).select_related(
+        "author")
+    page = CursorPaginator(comments, COMMENTS_PER_PAGE,
+                           COMMENT_ORDERING).get_page(cursor)
+    next_url = None
+    if page.next_cursor:
+        next_url = "{}?{}".format(
+            reverse("posts:comments", kwargs={
+                "username": post.author.username, "post_id": post.id}),
+            urlencode({"cursor": page.next_cursor}))
+    return {"comments": page.object_list, "comments_next_url": next_url}
+
+
+def comments(request, username, post_id):
+    """Фрагмент со следующей порцией комментариев для страницы поста."""
+    post = get_object_or_404(Post.objects.select_related("author").only(
+        "id", "author__username"), id=post_id, author__username=username)
+    return render(request, "includes/comment_list.html",
+                  _comment_chunk(post, request.GET.get("cursor")))
 
 
 @login_required
@@ -80,6 +194,9 @@ def post_edit(request, username, post_id):
     post = get_object_or_404(Post.objects.select_related("author"), id=post_id,
                              author__username=username)
 
+    if post.author != request.user:
+        return redirect("posts:post", username=username, post_id=post_id)
+
     if request.method != "POST":
 
         form = PostForm()
@@ -92,8 +209,11 @@ def post_edit(request, username, post_id):
 
     if form.is_valid():
         post = form.save(commit=False)
-        post.author = request.user
+        if "image" in form.changed_data:
+            post.thumbnail_ready = False
         form.save()
+        if "image" in form.changed_data:
+            thumbnails.schedule(post)
         return redirect("posts:post", username=username, post_id=post_id)
 
     return render(request, "new.html", {"form": form,
@@ -116,6 +236,8 @@ def new_post(request):
         post = form.save(commit=False)
         post.author = request.user
         form.save()
+        thumbnails.schedule(post)
+        notify.publish(post)
         return redirect("posts:index")
 
     return render(request, "new.html", {"form": form,
@@ -142,7 +264,6 @@ def add_comment(request, username, post_id):
 
     post = get_object_or_404(Post.objects.select_related("author"),
                              author__username=username, id=post_id)
-    comments = post.comments.all()
 
     form = CommentForm(request.POST or None)
     if form.is_valid():
@@ -154,15 +275,21 @@ def add_comment(request, username, post_id):
                         username=post.author.username,
                         post_id=post_id)
     return render(request, "includes/comments.html",
-                  {"form": form, "comments": comments, "post": post})
+                  {"form": form, "post": post, **_comment_chunk(post)})
 
 
 @login_required
+@conditional(lambda request: _feed_state(
+    request, TimelineEntry.objects.filter(user=request.user),
+    TIMELINE_FIELDS, TIMELINE_ORDERING,
+    count=counts.counter(counts.FOLLOW, request.user.pk)))
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    entries = TimelineEntry.objects.filter(user=request.user)
+    page = paginate(request, entries, ordering=TIMELINE_ORDERING,
+                    count=counts.counter(counts.FOLLOW, request.user.pk))
+    page.object_list = thumbnails.prefetch(
+        timeline.posts_for(page.object_list)
+    )
     return render(request,
                   "follow.html",
                   {"page": page})
@@ -184,3 +311,16 @@ def profile_unfollow(request, username):
         if unfollow.exists():
             unfollow.delete()
     return redirect("posts:profile", username)
+
+
+@staff_member_required
+def card_cache_stats(request):
+    return JsonResponse(cards.stats())
+
+
+def metrics_view(request):
+    """Метрики для Prometheus: по токену ``METRICS_TOKEN`` и персоналу."""
+    if not (request.user.is_staff or metrics.authorized(request)):
+        return HttpResponse(status=403)
+    return HttpResponse(metrics.render(metrics.collect()),
+                        content_type="text/plain; version=0.0.4")
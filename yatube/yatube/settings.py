@@ -32,6 +32,10 @@ ALLOWED_HOSTS = [
     "testserver",
 ]
 
+# Токен, с которым Prometheus читает /metrics (заголовок
+# "Authorization: Bearer <токен>"). Без токена страница открыта персоналу.
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+
 
 # Application definition
 
@@ -49,6 +53,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'posts.metrics.MetricsMiddleware',
+    'posts.replicas.PrimaryStickyMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,7 +69,7 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'posts.metrics.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -84,12 +90,37 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
 DATABASES = {
+    # posts.backends.sqlite3 включает WAL, busy_timeout, mmap и BEGIN
+    # IMMEDIATE; соединения живут CONN_MAX_AGE секунд и проверяются
+    # перед повторным использованием. Тестовые базы — файлы, как и в
+    # работе: тесты роутера копируют основную базу в реплику.
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'posts.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3')},
+    },
+    # Реплика только для чтения; без YATUBE_REPLICA_DB чтение с неё
+    # не включено.
+    'replica': {
+        'ENGINE': 'posts.backends.sqlite3',
+        'NAME': os.environ.get('YATUBE_REPLICA_DB',
+                               os.path.join(BASE_DIR, 'db_replica.sqlite3')),
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'NAME': os.path.join(BASE_DIR, 'test_replica.sqlite3')},
+    },
 }
 
+DATABASE_ROUTERS = ['posts.replicas.PrimaryReplicaRouter']
+
+# Базы, с которых читаются посты, комментарии и подписки.
+DATABASE_REPLICAS = ['replica'] if os.environ.get('YATUBE_REPLICA_DB') else []
+
+# Сколько секунд после записи запросы пользователя читают из основной базы.
+PRIMARY_STICKY_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -132,10 +163,22 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Кто отдаёт байты медиафайлов: "nginx" (X-Accel-Redirect на
+# MEDIA_ACCEL_PREFIX), "apache" (X-Sendfile) или пусто — сам Django.
+MEDIA_SERVER = os.environ.get('YATUBE_MEDIA_SERVER', '')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Сокет, через который воркеры сообщают серверу уведомлений
+# (python -m yatube.sse) о новых постах.
+NOTIFY_SOCKET = os.environ.get('YATUBE_NOTIFY_SOCKET',
+                               os.path.join(BASE_DIR, 'notify.sock'))
 
 LOGIN_URL = "/auth/login/"
 LOGIN_REDIRECT_URL = "posts:index"
 
+# Кэш страниц (posts.page_cache) держит копии PAGE_CACHE_TIMEOUT секунд,
+# только если кэш общий для воркеров (Redis, memcached, база); с
+# LocMemCache — не дольше PAGE_CACHE_LOCAL_TIMEOUT.
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
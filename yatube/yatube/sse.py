@@ -0,0 +1,69 @@
+"""
+Сервер уведомлений yatube (Server-Sent Events) на asyncio.
+
+Запускается рядом с воркерами WSGI::
+
+    python -m yatube.sse --host 127.0.0.1 --port 8001
+
+Фронтенд-сервер проксирует на него ``/events/`` без буферизации. Воркеры
+пишут в сокет ``NOTIFY_SOCKET``, поэтому оба работают на одной машине.
+Подробности в ``posts.notify``.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import resource
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+django.setup()
+
+from posts import notify  # noqa: E402
+
+
+OPEN_FILES_LIMIT = 65536
+
+logger = logging.getLogger(__name__)
+
+
+def raise_open_files_limit(limit=OPEN_FILES_LIMIT):
+    """Каждый ждущий клиент держит сокет: поднимаем мягкий предел.
+
+    Не выше ``limit``, даже если жёсткий предел не ограничен. Возвращает
+    действующий мягкий предел.
+    """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = limit if hard == resource.RLIM_INFINITY else min(hard, limit)
+    if soft != resource.RLIM_INFINITY and soft < target:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        except (ValueError, OSError) as error:
+            logger.warning("Не удалось поднять предел открытых файлов "
+                           "до %s: %s", target, error)
+            return soft
+        return target
+    return soft
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Сервер уведомлений о новых постах.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--socket', default=notify.NOTIFY_SOCKET)
+    options = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    raise_open_files_limit()
+    server = notify.Server(host=options.host, port=options.port,
+                           path=options.socket)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -19,12 +19,16 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from posts import media
+
 urlpatterns = [
 
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),
     path("admin/", admin.site.urls),
     path("about/", include("about.urls", namespace='about')),
+    path(settings.MEDIA_URL.lstrip("/") + "<path:path>", media.serve,
+         name="media"),
     path("", include("posts.urls", namespace='posts')),
 ]
 
@@ -33,7 +37,5 @@ handler404 = "posts.views.page_not_found"
 handler500 = "posts.views.server_error"
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL,
-                          document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL,
                           document_root=settings.STATIC_ROOT)